@@ -1,37 +1,125 @@
 from fastapi import HTTPException, Request, Response
 from datetime import datetime, timezone, timedelta
+import asyncio
 import httpx
+import logging
+import random
 import uuid
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
+from typing import Optional
+from cache import TTLCache
+from database import get_database
+from session_tokens import SessionSigner, RevocationList, parse_signing_keys, is_signed_token
+
+logger = logging.getLogger(__name__)
+
+# In-process auth caches: session_token -> {user_id, expires_at} and user_id -> user document.
+# User entries are dropped on writes in this process; the short TTL bounds staleness across workers.
+SESSION_CACHE_MAXSIZE = int(os.environ.get('SESSION_CACHE_MAXSIZE', '10000'))
+# Accepted security window: logout deletes the session in MongoDB but only evicts it from the
+# worker that served the logout. Every other worker keeps accepting the logged-out token until
+# its cached entry expires, i.e. for up to SESSION_CACHE_TTL seconds. Raising it trades that
+# window for fewer session lookups; 0 disables the cache (each request then reads MongoDB).
+_session_cache = TTLCache(SESSION_CACHE_MAXSIZE, int(os.environ.get('SESSION_CACHE_TTL', '10')))
+_user_cache = TTLCache(SESSION_CACHE_MAXSIZE, int(os.environ.get('USER_CACHE_TTL', '15')))
+
+SESSION_TTL = timedelta(days=7)
+
+# Fields the auth path loads; library membership lives in its own collections
+USER_FIELDS = ("user_id", "email", "name", "picture", "created_at", "preferences", "recently_played")
+USER_PROJECTION = {"_id": 0, **{field: 1 for field in USER_FIELDS}}
+
+# SESSION_MODE=signed issues stateless HMAC-signed tokens that are verified without MongoDB.
+# SESSION_SIGNING_KEYS is "kid:secret,..."; the first key signs, all listed keys still verify,
+# so keys are rotated by prepending a new one and dropping the oldest after SESSION_TTL.
+SESSION_MODE = os.environ.get('SESSION_MODE', 'db').lower()
+session_signer = SessionSigner(parse_signing_keys(os.environ.get('SESSION_SIGNING_KEYS', '')))
+if SESSION_MODE == 'signed' and session_signer.active_kid is None:
+    logger.error("SESSION_MODE=signed but SESSION_SIGNING_KEYS is empty; using database sessions")
+    SESSION_MODE = 'db'
+# Logged-out signed tokens; other workers pick up revocations within SESSION_REVOCATION_REFRESH seconds
+revocations = RevocationList(float(os.environ.get('SESSION_REVOCATION_REFRESH', '5')))
+
+# Shared client for the session-data exchange: keep-alive (and HTTP/2 when h2 is installed)
+# saves a TCP+TLS handshake per login; transient failures are retried with jittered backoff
+AUTH_HTTP_TIMEOUT = float(os.environ.get('AUTH_HTTP_TIMEOUT', '10'))
+AUTH_HTTP_CONNECT_TIMEOUT = float(os.environ.get('AUTH_HTTP_CONNECT_TIMEOUT', '3'))
+AUTH_HTTP_MAX_CONNECTIONS = int(os.environ.get('AUTH_HTTP_MAX_CONNECTIONS', '20'))
+AUTH_HTTP2 = os.environ.get('AUTH_HTTP2', 'true').lower() == 'true'
+AUTH_HTTP_RETRIES = int(os.environ.get('AUTH_HTTP_RETRIES', '2'))
+AUTH_HTTP_BACKOFF = float(os.environ.get('AUTH_HTTP_BACKOFF', '0.2'))
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+_auth_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_auth_http_client() -> httpx.AsyncClient:
+    """Get the pooled HTTP client used for the auth session-data exchange"""
+    global _auth_http_client
+    if _auth_http_client is None or _auth_http_client.is_closed:
+        http2 = AUTH_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("h2 is not installed; auth client falls back to HTTP/1.1")
+                http2 = False
+        _auth_http_client = httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(AUTH_HTTP_TIMEOUT, connect=AUTH_HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=AUTH_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=AUTH_HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=60
+            )
+        )
+    return _auth_http_client
+
+
+async def close_auth_http_client():
+    """Close the pooled auth HTTP client (called on app shutdown)"""
+    global _auth_http_client
+    if _auth_http_client is not None:
+        await _auth_http_client.aclose()
+        _auth_http_client = None
 
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'shinyfy_db')]
 
 # REMINDER: DO NOT HARDCODE THE URL, OR ADD ANY FALLBACKS OR REDIRECT URLS, THIS BREAKS THE AUTH
 
 async def get_session_data(session_id: str):
     """Get user data from Emergent Auth using session_id"""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
-            headers={"X-Session-ID": session_id}
-        )
-        if response.status_code != 200:
-            raise HTTPException(status_code=401, detail="Invalid session ID")
-        return response.json()
+    for attempt in range(AUTH_HTTP_RETRIES + 1):
+        try:
+            response = await get_auth_http_client().get(
+                "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data",
+                headers={"X-Session-ID": session_id}
+            )
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                break
+            error = f"HTTP {response.status_code}"
+        except httpx.TransportError as e:
+            error = f"{type(e).__name__}: {str(e)}"
+
+        if attempt == AUTH_HTTP_RETRIES:
+            logger.error(f"Session data request failed after {attempt + 1} attempts: {error}")
+            raise HTTPException(status_code=503, detail="Auth service unavailable")
+        # Full jitter keeps a burst of logins from retrying in lockstep
+        await asyncio.sleep(random.uniform(0, AUTH_HTTP_BACKOFF * 2 ** attempt))
+
+    if response.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid session ID")
+    return response.json()
 
 async def create_or_update_user(user_data: dict):
     """Create new user or update existing user"""
     email = user_data["email"]
     
     # Check if user exists
-    existing_user = await db.users.find_one({"email": email}, {"_id": 0})
+    existing_user = await get_database().users.find_one({"email": email}, {"_id": 0, "user_id": 1})
     
     if existing_user:
         # Update user data
-        await db.users.update_one(
+        await get_database().users.update_one(
             {"email": email},
             {"$set": {
                 "name": user_data["name"],
@@ -39,73 +127,177 @@ async def create_or_update_user(user_data: dict):
                 "google_id": user_data.get("id", "")
             }}
         )
+        invalidate_user_cache(existing_user["user_id"])
         return existing_user["user_id"]
     else:
         # Create new user
         user_id = f"user_{uuid.uuid4().hex[:12]}"
-        await db.users.insert_one({
+        await get_database().users.insert_one({
             "user_id": user_id,
             "email": email,
             "name": user_data["name"],
             "picture": user_data.get("picture", ""),
             "google_id": user_data.get("id", ""),
             "created_at": datetime.now(timezone.utc),
-            "liked_songs": [],
-            "playlists": [],
             "recently_played": [],
             "preferences": {"region": "global", "favorite_genres": []}
         })
         return user_id
 
-async def create_session(user_id: str, session_token: str):
-    """Create a new session in database"""
-    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+async def create_session(user_id: str, session_token: str) -> str:
+    """Create a new session and return the token to hand to the client"""
+    expires_at = datetime.now(timezone.utc) + SESSION_TTL
+    if SESSION_MODE == 'signed':
+        return session_signer.sign(user_id, expires_at)
     
-    await db.user_sessions.insert_one({
+    await get_database().user_sessions.insert_one({
         "user_id": user_id,
         "session_token": session_token,
         "expires_at": expires_at,
         "created_at": datetime.now(timezone.utc)
     })
+    return session_token
 
-async def get_user_from_session(request: Request) -> dict:
-    """Get user from session token (cookie or header)"""
+def _get_session_token(request: Request) -> Optional[str]:
+    """Read the session token from the cookie or the Authorization header"""
     # Try cookie first
     session_token = request.cookies.get("session_token")
-    
+
     # Fallback to Authorization header
     if not session_token:
         auth_header = request.headers.get("Authorization")
         if auth_header and auth_header.startswith("Bearer "):
             session_token = auth_header.replace("Bearer ", "")
-    
-    if not session_token:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
-    # Find session in database
-    session_doc = await db.user_sessions.find_one({"session_token": session_token})
-    if not session_doc:
-        raise HTTPException(status_code=401, detail="Invalid session")
-    
-    # Check expiry
-    expires_at = session_doc["expires_at"]
+
+    return session_token
+
+def _parse_expiry(expires_at) -> datetime:
     if isinstance(expires_at, str):
         expires_at = datetime.fromisoformat(expires_at)
     if expires_at.tzinfo is None:
         expires_at = expires_at.replace(tzinfo=timezone.utc)
-    if expires_at < datetime.now(timezone.utc):
+    return expires_at
+
+async def _load_session(session_token: str) -> Optional[dict]:
+    """Fetch a session together with its user in a single round trip"""
+    docs = await get_database().user_sessions.aggregate([
+        {"$match": {"session_token": session_token}},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": "users",
+            "localField": "user_id",
+            "foreignField": "user_id",
+            "as": "user"
+        }},
+        {"$project": {"_id": 0, "user_id": 1, "expires_at": 1, "user": {"$arrayElemAt": ["$user", 0]}}},
+        {"$project": {"user_id": 1, "expires_at": 1, **{f"user.{field}": 1 for field in USER_FIELDS}}}
+    ]).to_list(1)
+    return docs[0] if docs else None
+
+async def _verify_signed_session(session_token: str) -> Optional[dict]:
+    """Check a signed token with CPU only (plus the in-memory denylist)"""
+    claims = session_signer.verify(session_token)
+    if claims is None or await revocations.is_revoked(get_database().revoked_sessions, claims["jti"]):
+        return None
+    return claims
+
+def _cache_session(session_token: str, session_doc: dict, now: datetime) -> dict:
+    """Remember a session for at most its remaining lifetime"""
+    session = {"user_id": session_doc["user_id"], "expires_at": _parse_expiry(session_doc["expires_at"])}
+    remaining = (session["expires_at"] - now).total_seconds()
+    if remaining > 0:
+        _session_cache.set(session_token, session, ttl=min(remaining, _session_cache.ttl))
+    return session
+
+async def get_session_user_id(request: Request) -> Optional[str]:
+    """Get the user_id of a valid session without loading the user (None when anonymous)"""
+    session_token = _get_session_token(request)
+    if not session_token:
+        return None
+    if is_signed_token(session_token):
+        session = await _verify_signed_session(session_token)
+        return session["user_id"] if session else None
+
+    now = datetime.now(timezone.utc)
+    session = _session_cache.get(session_token)
+    if session is None:
+        session_doc = await get_database().user_sessions.find_one(
+            {"session_token": session_token},
+            {"_id": 0, "user_id": 1, "expires_at": 1}
+        )
+        if not session_doc:
+            return None
+        session = _cache_session(session_token, session_doc, now)
+
+    if session["expires_at"] < now:
+        return None
+    return session["user_id"]
+
+async def get_user_from_session(request: Request) -> dict:
+    """Get user from session token (cookie or header)"""
+    session_token = _get_session_token(request)
+    if not session_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    now = datetime.now(timezone.utc)
+    session = _session_cache.get(session_token)
+    user = None
+
+    if is_signed_token(session_token):
+        session = await _verify_signed_session(session_token)
+        if session is None:
+            raise HTTPException(status_code=401, detail="Invalid session")
+    elif session is None:
+        # Cold path: find session and user in database
+        session_doc = await _load_session(session_token)
+        if not session_doc:
+            raise HTTPException(status_code=401, detail="Invalid session")
+
+        session = _cache_session(session_token, session_doc, now)
+        user = session_doc.get("user")
+
+    # Check expiry
+    if session["expires_at"] < now:
+        _session_cache.pop(session_token)
         raise HTTPException(status_code=401, detail="Session expired")
-    
-    # Get user data
-    user = await db.users.find_one({"user_id": session_doc["user_id"]}, {"_id": 0})
+
+    # Get user data; only a document just read from MongoDB (re)starts the cache TTL,
+    # so cache hits cannot keep a stale copy alive past USER_CACHE_TTL
+    from_db = user is not None
+    if user is None:
+        user = _user_cache.get(session["user_id"])
+    if user is None:
+        user = await get_database().users.find_one({"user_id": session["user_id"]}, USER_PROJECTION)
+        from_db = True
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    
+
+    if from_db:
+        user.pop("_id", None)
+        _user_cache.set(session["user_id"], user)
     return user
 
+def invalidate_user_cache(user_id: str):
+    """Drop a cached user document after it changes"""
+    _user_cache.pop(user_id)
+
+def get_auth_cache_stats() -> dict:
+    return {
+        "session_mode": SESSION_MODE,
+        "sessions": _session_cache.stats(),
+        "users": _user_cache.stats(),
+        "revocations": revocations.stats()
+    }
+
 async def delete_session(session_token: str):
-    """Delete session from database"""
-    await db.user_sessions.delete_one({"session_token": session_token})
+    """Delete session from database, or revoke a signed token"""
+    if is_signed_token(session_token):
+        claims = session_signer.verify(session_token)
+        if claims:
+            await revocations.revoke(get_database().revoked_sessions, claims["jti"], claims["expires_at"])
+        return
+    _session_cache.pop(session_token)
+    await get_database().user_sessions.delete_one({"session_token": session_token})
 
 def set_session_cookie(response: Response, session_token: str):
     """Set session cookie"""
@@ -116,7 +308,7 @@ def set_session_cookie(response: Response, session_token: str):
         secure=True,
         samesite="none",
         path="/",
-        max_age=7 * 24 * 60 * 60  # 7 days
+        max_age=int(SESSION_TTL.total_seconds())  # 7 days
     )
 
 def clear_session_cookie(response: Response):
@@ -0,0 +1,126 @@
+from typing import Annotated, Optional
+import logging
+import os
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+
+def _client_options() -> dict:
+    """Pool settings, read when the client is created (i.e. after server.py has loaded .env)"""
+    options = {
+        "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', '50')),
+        "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', '5')),
+        "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+        "readPreference": os.environ.get('MONGO_READ_PREFERENCE', 'primary')
+    }
+    compressors = os.environ.get('MONGO_COMPRESSORS', '')  # e.g. "zstd,snappy,zlib"
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters fed by the driver's pool events"""
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self.created = 0
+        self.closed = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.created += 1
+        self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.closed += 1
+        self.open -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        self.checkouts += 1
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+    def stats(self) -> dict:
+        return {
+            "open": self.open,
+            "checked_out": self.checked_out,
+            "created": self.created,
+            "closed": self.closed,
+            "checkouts": self.checkouts,
+            "checkout_failures": self.checkout_failures,
+            "pool_clears": self.pool_clears
+        }
+
+
+# One client (and so one connection pool) per worker, shared by every module
+pool_stats = PoolStats()
+_client: Optional[AsyncIOMotorClient] = None
+
+
+def connect_database() -> AsyncIOMotorDatabase:
+    """Create the shared client (called once from the app lifespan) and return the database"""
+    global _client
+    if _client is None:
+        options = _client_options()
+        _client = AsyncIOMotorClient(os.environ['MONGO_URL'], event_listeners=[pool_stats], **options)
+        logger.info(f"MongoDB client created with {options}")
+    return get_database()
+
+
+def close_database():
+    """Close the shared client and its pool"""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    """The application database; FastAPI dependency for routes"""
+    if _client is None:
+        raise RuntimeError("MongoDB client is not connected; call connect_database() first")
+    return _client[os.environ.get('DB_NAME', 'shinyfy_db')]
+
+
+Database = Annotated[AsyncIOMotorDatabase, Depends(get_database)]
+
+
+def get_pool_stats() -> dict:
+    """Connection pool counters plus the configured pool bounds"""
+    if _client is None:
+        return pool_stats.stats()
+    return {
+        **pool_stats.stats(),
+        "max_pool_size": _client.options.pool_options.max_pool_size,
+        "min_pool_size": _client.options.pool_options.min_pool_size
+    }
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import CollectionInvalid, OperationFailure
+from database import connect_database, close_database
+from pagination import sort_spec
+
+logger = logging.getLogger(__name__)
+
+# collection -> [(keys, options)]; create_index is idempotent for identical specs
+INDEXES = {
+    "songs": [
+        ([("song_id", ASCENDING)], {"unique": True}),
+        # Keyset pagination of /songs: (filters..., plays desc, _id desc)
+        ([("plays", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("region", ASCENDING), ("plays", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("genre", ASCENDING), ("plays", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("region", ASCENDING), ("genre", ASCENDING), ("plays", DESCENDING), ("_id", DESCENDING)], {}),
+        # Relevance-ranked /songs/search: title > artist > album
+        ([("title", TEXT), ("artist", TEXT), ("album", TEXT)],
+         {"name": "songs_text", "weights": {"title": 10, "artist": 5, "album": 2}}),
+    ],
+    "playlists": [
+        ([("playlist_id", ASCENDING)], {"unique": True}),
+        ([("is_public", ASCENDING), ("followers", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("owner", ASCENDING)], {}),
+        ([("name", TEXT), ("description", TEXT)],
+         {"name": "playlists_text", "weights": {"name": 10, "description": 2}}),
+    ],
+    "artists": [
+        ([("artist_id", ASCENDING)], {"unique": True}),
+        ([("followers", DESCENDING), ("_id", DESCENDING)], {}),
+        ([("name", TEXT)], {"name": "artists_text"}),
+    ],
+    "users": [
+        ([("user_id", ASCENDING)], {"unique": True}),
+        ([("email", ASCENDING)], {"unique": True}),
+    ],
+    # User library membership, one document per (user, item) instead of arrays in the user document
+    "liked_songs": [
+        ([("user_id", ASCENDING), ("song_id", ASCENDING)], {"unique": True}),
+        ([("user_id", ASCENDING), ("liked_at", DESCENDING), ("_id", DESCENDING)], {}),
+    ],
+    "library_playlists": [
+        ([("user_id", ASCENDING), ("playlist_id", ASCENDING)], {"unique": True}),
+        ([("user_id", ASCENDING), ("added_at", DESCENDING)], {}),
+        ([("playlist_id", ASCENDING)], {}),
+    ],
+    "user_sessions": [
+        ([("session_token", ASCENDING)], {"unique": True}),
+        # Expired sessions are purged by MongoDB's TTL monitor
+        ([("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+    # Denylist of logged-out signed session tokens, kept until the token would expire anyway
+    "revoked_sessions": [
+        ([("jti", ASCENDING)], {"unique": True}),
+        ([("revoked_at", ASCENDING)], {}),
+        ([("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+    # Chart counters written by the play counter; hourly buckets only back short windows
+    "play_counts_hourly": [
+        ([("region", ASCENDING), ("bucket", ASCENDING), ("song_id", ASCENDING)], {"unique": True}),
+        ([("bucket", ASCENDING)], {"expireAfterSeconds": 8 * 24 * 3600}),
+    ],
+    "play_counts_daily": [
+        ([("region", ASCENDING), ("bucket", ASCENDING), ("song_id", ASCENDING)], {"unique": True}),
+        ([("bucket", ASCENDING)], {"expireAfterSeconds": 400 * 24 * 3600}),
+    ],
+    "youtube_cache": [
+        ([("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+}
+
+
+# Append-only play event log (time-series collection; raw events kept for PLAY_EVENTS_RETENTION_DAYS)
+PLAY_EVENTS_RETENTION_DAYS = int(os.environ.get('PLAY_EVENTS_RETENTION_DAYS', '30'))
+
+
+async def ensure_collections(db):
+    """Create collections that need options up front; safe to run on each startup"""
+    if "play_events" in await db.list_collection_names():
+        return
+    try:
+        await db.create_collection(
+            "play_events",
+            timeseries={"timeField": "ts", "metaField": "meta", "granularity": "seconds"},
+            expireAfterSeconds=PLAY_EVENTS_RETENTION_DAYS * 24 * 3600
+        )
+    except CollectionInvalid:
+        # Another worker created it first
+        return
+    except OperationFailure as e:
+        if e.code == 48:  # NamespaceExists
+            return
+        # Servers without time-series support (< 5.0) get a bounded capped collection instead
+        logger.warning(f"Time-series play_events unavailable, using a capped collection: {str(e)}")
+        await db.create_collection("play_events", capped=True, size=512 * 1024 * 1024)
+
+
+async def ensure_indexes(db):
+    """Create every index in INDEXES; safe to run on each startup"""
+    await ensure_collections(db)
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                await db[collection].create_index(keys, **options)
+            except OperationFailure as e:
+                # e.g. duplicate data blocking a unique index; keep serving and report it
+                logger.error(f"Could not create index {keys} on {collection}: {str(e)}")
+
+
+def explain_queries():
+    """Representative query of each endpoint: (label, collection, filter, sort)"""
+    return [
+        ("GET /songs?region=&genre=", "songs", {"region": "Global", "genre": "Pop"}, sort_spec("plays")),
+        ("GET /songs", "songs", {}, sort_spec("plays")),
+        ("GET /songs/{song_id}", "songs", {"song_id": "song_x"}, None),
+        ("GET /songs/search (songs)", "songs", {"$text": {"$search": "lights"}}, None),
+        ("GET /songs/search (playlists)", "playlists", {"$text": {"$search": "lights"}}, None),
+        ("GET /songs/search (artists)", "artists", {"$text": {"$search": "lights"}}, None),
+        ("GET /library/* (songs $in)", "songs", {"song_id": {"$in": ["song_x", "song_y"]}}, None),
+        ("GET /library/liked-songs", "liked_songs", {"user_id": "user_x"}, sort_spec("liked_at")),
+        ("GET /library/playlists (membership)", "library_playlists", {"user_id": "user_x"}, [("added_at", DESCENDING)]),
+        ("GET /playlists", "playlists", {"is_public": True}, sort_spec("followers")),
+        ("GET /playlists/{playlist_id}", "playlists", {"playlist_id": "playlist_x"}, None),
+        ("GET /library/playlists", "playlists", {"playlist_id": {"$in": ["playlist_x"]}}, None),
+        ("GET /artists", "artists", {}, sort_spec("followers")),
+        ("GET /artists/{artist_id}", "artists", {"artist_id": "artist_x"}, None),
+        ("GET /charts", "play_counts_daily", {"region": "global", "bucket": {"$gte": datetime(2000, 1, 1, tzinfo=timezone.utc)}}, None),
+        ("auth: session lookup", "user_sessions", {"session_token": "token_x"}, None),
+        ("auth: user by id", "users", {"user_id": "user_x"}, None),
+        ("auth: user by email", "users", {"email": "x@example.com"}, None),
+    ]
+
+
+def _plan_stages(plan) -> list:
+    """Collect every stage name in an explain() plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+
+async def print_explain_plans(db) -> bool:
+    """Print the winning plan of each endpoint query; returns False if any does a COLLSCAN"""
+    ok = True
+    for label, collection, query, sort in explain_queries():
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = await cursor.explain()
+        stages = _plan_stages(plan.get("queryPlanner", {}).get("winningPlan", {}))
+        scan = "COLLSCAN" in stages
+        ok = ok and not scan
+        print(f"{'❌' if scan else '✅'} {label:<32} {collection:<14} {' <- '.join(stages)}")
+    return ok
+
+
+async def main():
+    os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    db = connect_database()
+
+    print("Ensuring Shinyfy indexes...")
+    await ensure_indexes(db)
+    print("✅ Indexes in place")
+
+    ok = True
+    if "--explain" in sys.argv:
+        print("\nQuery plans:")
+        ok = await print_explain_plans(db)
+
+    close_database()
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
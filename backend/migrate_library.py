@@ -0,0 +1,89 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from pymongo import UpdateOne
+from database import connect_database, close_database
+from indexes import ensure_indexes
+
+# Users are migrated in batches; re-running the script is safe
+BATCH_SIZE = 500
+
+
+def _memberships(user: dict, now: datetime):
+    """Membership upserts for one user's embedded arrays, oldest first"""
+    liked, library = [], []
+    # Array order is insertion order; spread timestamps 1ms apart so liked_at keeps it
+    song_ids = user.get("liked_songs") or []
+    for i, song_id in enumerate(song_ids):
+        liked.append(UpdateOne(
+            {"user_id": user["user_id"], "song_id": song_id},
+            {"$setOnInsert": {"liked_at": now - timedelta(milliseconds=len(song_ids) - i)}},
+            upsert=True
+        ))
+    playlist_ids = user.get("playlists") or []
+    for i, playlist_id in enumerate(playlist_ids):
+        library.append(UpdateOne(
+            {"user_id": user["user_id"], "playlist_id": playlist_id},
+            {"$setOnInsert": {"added_at": now - timedelta(milliseconds=len(playlist_ids) - i)}},
+            upsert=True
+        ))
+    return liked, library
+
+
+async def migrate(db) -> dict:
+    """Move users.liked_songs / users.playlists into the liked_songs / library_playlists collections"""
+    now = datetime.now(timezone.utc)
+    counts = {"users": 0, "liked_songs": 0, "library_playlists": 0}
+    cursor = db.users.find(
+        {"$or": [{"liked_songs": {"$exists": True}}, {"playlists": {"$exists": True}}]},
+        {"_id": 0, "user_id": 1, "liked_songs": 1, "playlists": 1}
+    )
+
+    batch = []
+    async for user in cursor:
+        batch.append(user)
+        if len(batch) >= BATCH_SIZE:
+            await _migrate_batch(db, batch, now, counts)
+            batch = []
+    if batch:
+        await _migrate_batch(db, batch, now, counts)
+    return counts
+
+
+async def _migrate_batch(db, users: list, now: datetime, counts: dict):
+    liked, library = [], []
+    for user in users:
+        user_liked, user_library = _memberships(user, now)
+        liked.extend(user_liked)
+        library.extend(user_library)
+
+    if liked:
+        await db.liked_songs.bulk_write(liked, ordered=False)
+    if library:
+        await db.library_playlists.bulk_write(library, ordered=False)
+    # Only drop the arrays once their memberships are written
+    await db.users.update_many(
+        {"user_id": {"$in": [user["user_id"] for user in users]}},
+        {"$unset": {"liked_songs": "", "playlists": ""}}
+    )
+
+    counts["users"] += len(users)
+    counts["liked_songs"] += len(liked)
+    counts["library_playlists"] += len(library)
+
+
+async def main():
+    os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    db = connect_database()
+
+    print("Migrating user libraries...")
+    await ensure_indexes(db)
+    counts = await migrate(db)
+    print(f"✅ Migrated {counts['users']} users: {counts['liked_songs']} liked songs, "
+          f"{counts['library_playlists']} library playlists")
+
+    close_database()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -9,8 +9,6 @@ class User(BaseModel):
     name: str
     picture: Optional[str] = None
     created_at: datetime
-    liked_songs: List[str] = []
-    playlists: List[str] = []
     recently_played: List[str] = []
     preferences: Dict = {"region": "global", "favorite_genres": []}
 
@@ -72,6 +70,13 @@ class PlaylistUpdate(BaseModel):
     cover_url: Optional[str] = None
     is_public: Optional[bool] = None
 
+# Batch library edits (likes and playlist songs)
+class SongBatchRequest(BaseModel):
+    song_ids: List[str] = Field(..., min_length=1, max_length=500)
+
+class PlaylistSongsBatchAdd(SongBatchRequest):
+    position: Optional[int] = Field(None, ge=0)  # Insert at this index instead of appending
+
 # Artist Models
 class Artist(BaseModel):
     artist_id: str
@@ -93,6 +98,9 @@ class YouTubeVideo(BaseModel):
     view_count: int = 0
     published_at: str
 
+class YouTubeVideoBatchRequest(BaseModel):
+    video_ids: List[str] = Field(..., min_length=1, max_length=200)
+
 class YouTubeSearchResult(BaseModel):
     videos: List[YouTubeVideo]
     next_page_token: Optional[str] = None
\ No newline at end of file
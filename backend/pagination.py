@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+import base64
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from pymongo import DESCENDING
+
+# Sort field values a cursor may carry; anything else (e.g. a query operator document) is rejected
+CURSOR_VALUE_TYPES = (str, int, float, bool, datetime, type(None))
+
+
+def encode_cursor(value: Any, _id: ObjectId) -> str:
+    """Opaque token for the position just after a document"""
+    # Extended JSON keeps datetimes (e.g. liked_at) comparable after a round trip
+    payload = json_util.dumps([value, str(_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        value, _id = json_util.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        # The value goes straight into the query, so a crafted {"$gt": ""} must not pass as one
+        if not isinstance(value, CURSOR_VALUE_TYPES) or not isinstance(_id, str):
+            raise ValueError("Unexpected cursor value")
+        return value, ObjectId(_id)
+    except (ValueError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def sort_spec(field: str) -> list:
+    """Stable page order: field descending, ties broken by _id"""
+    return [(field, DESCENDING), ("_id", DESCENDING)]
+
+
+async def fetch_page(
+    collection,
+    query: dict,
+    field: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    projection: Optional[dict] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """Fetch one page ordered by (field desc, _id desc) and the cursor of the next page"""
+    if cursor is not None and skip:
+        # An offset from a cursor position would silently drop documents between pages
+        raise HTTPException(status_code=400, detail="skip cannot be combined with cursor")
+
+    drop_field = False
+    if projection is not None:
+        # The cursor is built from field and _id, so fetch them even if not asked for
+        drop_field = not projection.get(field)
+        projection = {**projection, field: 1, "_id": 1}
+
+    if cursor:
+        # Keyset pagination: start right after the cursor with an index range, so a deep
+        # page costs the same as the first one (skip is only kept for legacy clients)
+        value, _id = decode_cursor(cursor)
+        query = {"$and": [query, {"$or": [
+            {field: {"$lt": value}},
+            {field: value, "_id": {"$lt": _id}}
+        ]}]}
+
+    find = collection.find(query, projection).sort(sort_spec(field))
+    if skip:
+        find = find.skip(skip)
+    docs = await find.limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1].get(field), docs[-1]["_id"])
+    for doc in docs:
+        doc.pop("_id", None)
+        if drop_field:
+            doc.pop(field, None)
+    return docs, next_cursor
@@ -0,0 +1,177 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+import asyncio
+import logging
+import os
+import time
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Flush buffered plays every PLAY_FLUSH_INTERVAL_MS or as soon as PLAY_FLUSH_MAX_EVENTS are pending
+PLAY_FLUSH_INTERVAL_MS = int(os.environ.get('PLAY_FLUSH_INTERVAL_MS', '1000'))
+PLAY_FLUSH_MAX_EVENTS = int(os.environ.get('PLAY_FLUSH_MAX_EVENTS', '1000'))
+
+
+def _hour(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def _day(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _song_inc(song_id: str, count: int) -> UpdateOne:
+    return UpdateOne({"song_id": song_id}, {"$inc": {"plays": count}})
+
+
+def _rollup_inc(key: Tuple[str, datetime, str, str], count: int) -> UpdateOne:
+    _, bucket, region, song_id = key
+    return UpdateOne({"region": region, "bucket": bucket, "song_id": song_id}, {"$inc": {"plays": count}}, upsert=True)
+
+
+class PlayCounter:
+    """Write-behind buffer for plays: song play counts, the play event log and chart rollups"""
+
+    def __init__(self, flush_interval_ms: int, max_pending: int):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._pending: Dict[str, int] = {}
+        self._events: List[dict] = []
+        # (granularity, bucket, region, song_id) -> plays
+        self._rollups: Dict[Tuple[str, datetime, str, str], int] = {}
+        self._pending_events = 0
+        self._oldest_pending: Optional[float] = None
+        self.flushes = 0
+        self.flushed_events = 0
+        self.errors = 0
+        self.last_flush_lag_ms = 0.0
+
+    def record(self, song_id: str, user_id: Optional[str] = None, region: str = "global"):
+        """Count one play; it reaches MongoDB on the next flush"""
+        now = datetime.now(timezone.utc)
+        self._pending[song_id] = self._pending.get(song_id, 0) + 1
+        self._events.append({"ts": now, "meta": {"song_id": song_id, "region": region}, "user_id": user_id})
+        # Every play counts towards its region's charts and the global charts
+        for chart_region in {region, "global"}:
+            for granularity, bucket in (("hourly", _hour(now)), ("daily", _day(now))):
+                key = (granularity, bucket, chart_region, song_id)
+                self._rollups[key] = self._rollups.get(key, 0) + 1
+        self._pending_events += 1
+        if self._oldest_pending is None:
+            self._oldest_pending = time.monotonic()
+        if self._pending_events >= self.max_pending:
+            self._wakeup.set()
+
+    async def flush(self):
+        """Write all buffered plays with one unordered bulk_write per collection"""
+        # Rollups re-queued by a failed flush are retried even when no new plays arrived
+        if not (self._pending or self._rollups or self._events) or self._db is None:
+            return
+
+        pending, events, oldest = self._pending, self._pending_events, self._oldest_pending
+        log, rollups = self._events, self._rollups
+        self._pending, self._pending_events, self._oldest_pending = {}, 0, None
+        self._events, self._rollups = [], {}
+
+        counts = list(pending.items())
+        hourly = [(key, count) for key, count in rollups.items() if key[0] == "hourly"]
+        daily = [(key, count) for key, count in rollups.items() if key[0] == "daily"]
+        failed_counts, failed_hourly, failed_daily, _ = await asyncio.gather(
+            self._bulk_inc("Play count", self._db.songs, counts, _song_inc),
+            self._bulk_inc("Hourly chart rollup", self._db.play_counts_hourly, hourly, _rollup_inc),
+            self._bulk_inc("Daily chart rollup", self._db.play_counts_daily, daily, _rollup_inc),
+            self._flush_events(log)
+        )
+
+        # Put back only the increments that were not applied so the next flush retries them
+        for key, count in failed_hourly + failed_daily:
+            self._rollups[key] = self._rollups.get(key, 0) + count
+        requeued = 0
+        for song_id, count in failed_counts:
+            self._pending[song_id] = self._pending.get(song_id, 0) + count
+            requeued += count
+        if requeued:
+            self._pending_events += requeued
+            self._oldest_pending = min(oldest, self._oldest_pending or oldest)
+
+        self.flushes += 1
+        self.flushed_events += events - requeued
+        if oldest is not None and not requeued:
+            self.last_flush_lag_ms = (time.monotonic() - oldest) * 1000
+
+    async def _bulk_inc(self, name: str, collection, items: List[tuple], make_op) -> List[tuple]:
+        """Unordered bulk_write of one op per (key, count) item; returns the items that were not applied"""
+        if not items:
+            return []
+        try:
+            await collection.bulk_write([make_op(key, count) for key, count in items], ordered=False)
+        except BulkWriteError as e:
+            # Unordered writes carry on past errors; every op not listed in writeErrors was applied
+            failed = [items[error["index"]] for error in e.details.get("writeErrors", [])]
+            logger.error(f"{name} flush failed for {len(failed)} of {len(items)} writes: {str(e)}")
+            self.errors += 1
+            return failed
+        except Exception as e:
+            logger.error(f"{name} flush failed: {str(e)}")
+            self.errors += 1
+            return items
+        return []
+
+    async def _flush_events(self, log: List[dict]):
+        if not log:
+            return
+        try:
+            await self._db.play_events.insert_many(log, ordered=False)
+        except Exception as e:
+            # The event log is best effort; counters and rollups are retried
+            logger.error(f"Play event log write failed: {str(e)}")
+            self.errors += 1
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self, db):
+        """Start the background flusher writing to db"""
+        self._db = db
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write whatever is still buffered"""
+        if self._task is not None:
+            # Not cancelled: a flush in progress holds the plays it took from the buffer, so the
+            # loop is woken and allowed to finish it (and one last flush) before it exits
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        # Writes re-queued by a failed last flush get one more try
+        await self.flush()
+
+    def stats(self) -> dict:
+        """Buffer size and flush lag (age of the oldest play not yet in MongoDB)"""
+        return {
+            "pending_songs": len(self._pending),
+            "pending_events": self._pending_events,
+            "pending_rollups": len(self._rollups),
+            "flush_lag_ms": (time.monotonic() - self._oldest_pending) * 1000 if self._oldest_pending else 0.0,
+            "last_flush_lag_ms": self.last_flush_lag_ms,
+            "flushes": self.flushes,
+            "flushed_events": self.flushed_events,
+            "errors": self.errors
+        }
+
+
+play_counter = PlayCounter(PLAY_FLUSH_INTERVAL_MS, PLAY_FLUSH_MAX_EVENTS)
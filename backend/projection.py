@@ -0,0 +1,21 @@
+from typing import Optional
+from fastapi import HTTPException
+from models import Song
+
+SONG_FIELDS = tuple(Song.model_fields)
+# List views render song cards; lyrics are only served by /songs/{song_id}/lyrics
+SONG_CARD_FIELDS = tuple(field for field in SONG_FIELDS if field != "lyrics")
+SONG_CARD_PROJECTION = {"_id": 0, **{field: 1 for field in SONG_CARD_FIELDS}}
+
+
+def song_projection(fields: Optional[str] = None) -> dict:
+    """MongoDB projection for a comma-separated ?fields= list (default: card fields)"""
+    if not fields:
+        return SONG_CARD_PROJECTION
+
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(selected) - set(SONG_FIELDS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown song fields: {', '.join(unknown)}")
+    # song_id is always returned so clients can key and link rows
+    return {"_id": 0, "song_id": 1, **{field: 1 for field in selected}}
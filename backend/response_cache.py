@@ -0,0 +1,79 @@
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set
+import hashlib
+import os
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+from cache import TTLCache
+
+RESPONSE_CACHE_MAXSIZE = int(os.environ.get('RESPONSE_CACHE_MAXSIZE', '10000'))
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', '60'))
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix added by a proxy still matches
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+class ResponseCache:
+    """Bounded cache of rendered JSON responses with strong ETags and tag-based invalidation"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        # key -> (body, etag, tags); expired and evicted keys are dropped from their tags too
+        self._entries = TTLCache(maxsize, ttl, on_evict=self._untag)
+        self._keys_by_tag: Dict[str, Set[Hashable]] = defaultdict(set)
+        self.not_modified = 0
+
+    def _untag(self, key: Hashable, entry: tuple):
+        for tag in entry[2]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    async def respond(
+        self,
+        request: Request,
+        key: Hashable,
+        tags: Iterable[str],
+        loader: Callable[[], Awaitable[Any]],
+        cache_control: str = "public, max-age=60",
+        ttl: Optional[float] = None
+    ) -> Response:
+        """Serve a cached body (or 304) for key, rendering it with loader() on a miss; ttl=0 only sets the ETag"""
+        entry = self._entries.get(key)
+        if entry is None:
+            # Errors raised by loader (e.g. 404) propagate and are not cached
+            body = ORJSONResponse(content=None).render(await loader())
+            entry = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"', tuple(tags))
+            if ttl != 0:
+                self._entries.set(key, entry, ttl)
+                for tag in entry[2]:
+                    self._keys_by_tag[tag].add(key)
+
+        body, etag, _ = entry
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if _etag_matches(request, etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def invalidate(self, *tags: str):
+        """Drop every cached response carrying one of tags (in this worker only)"""
+        for tag in tags:
+            for key in self._keys_by_tag.pop(tag, ()):
+                entry = self._entries.pop(key)
+                if entry is not None:
+                    self._untag(key, entry)
+
+    def stats(self) -> dict:
+        return {**self._entries.stats(), "not_modified": self.not_modified, "tags": len(self._keys_by_tag)}
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAXSIZE, RESPONSE_CACHE_TTL)
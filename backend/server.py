@@ -1,38 +1,69 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
 import os
+import asyncio
 import logging
 from pathlib import Path
 from typing import List, Optional
 import uuid
-from datetime import datetime, timezone
+import secrets
+from datetime import datetime, timezone, timedelta
+from pymongo import UpdateOne
 
 # Import models and services
 from models import (
-    User, Song, Playlist, PlaylistCreate, PlaylistUpdate,
-    Artist, YouTubeVideo, YouTubeSearchResult
+    User, Playlist, PlaylistCreate, PlaylistUpdate, SongBatchRequest, PlaylistSongsBatchAdd,
+    Artist, YouTubeVideo, YouTubeVideoBatchRequest, YouTubeSearchResult
 )
 from auth import (
     get_session_data, create_or_update_user, create_session,
-    get_user_from_session, delete_session, set_session_cookie, clear_session_cookie
+    get_user_from_session, get_session_user_id, delete_session, set_session_cookie, clear_session_cookie,
+    invalidate_user_cache, get_auth_cache_stats, close_auth_http_client
 )
+from database import Database, connect_database, close_database, get_pool_stats
+from indexes import ensure_indexes
+from suggest import suggest_index, build_suggest_index, playlist_doc
+from pagination import fetch_page
+from projection import song_projection, SONG_CARD_PROJECTION
+from play_counter import play_counter
+from cache import TTLCache, RefreshingCache
+from response_cache import response_cache
 from youtube_service import (
-    search_youtube_music, get_youtube_video_details, get_related_videos
+    search_youtube_music, get_youtube_video_details, get_youtube_videos_bulk, get_related_videos,
+    close_http_client as close_youtube_client, configure_cache_store, get_cache_stats,
+    get_quota_stats
 )
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'shinyfy_db')]
 
-# Create the main app without a prefix
-app = FastAPI(title="Shinyfy API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One MongoDB client per worker, injected into routes via Depends(get_database)
+    db = connect_database()
+    await ensure_indexes(db)
+    await build_suggest_index(db)
+    play_counter.start(db)
+    # Optional MongoDB tier so cached YouTube responses survive restarts and are shared by workers
+    if os.environ.get('YOUTUBE_CACHE_MONGO', 'false').lower() == 'true':
+        configure_cache_store(db.youtube_cache)
+    try:
+        yield
+    finally:
+        # Flush buffered plays before the MongoDB client is closed
+        await play_counter.stop()
+        close_database()
+        await close_youtube_client()
+        await close_auth_http_client()
+
+
+# Create the main app without a prefix; responses are encoded with orjson (datetimes natively).
+# Hot list endpoints return ORJSONResponse themselves to also skip jsonable_encoder.
+app = FastAPI(title="Shinyfy API", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -44,11 +75,22 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Number of songs kept in a user's recently played list
+RECENTLY_PLAYED_LIMIT = 20
+
+# CDN caching of catalog reads; playlists change under their owner, so they are revalidated each time
+CATALOG_CACHE_CONTROL = os.environ.get('CATALOG_CACHE_CONTROL', 'public, max-age=60')
+PLAYLIST_CACHE_CONTROL = os.environ.get('PLAYLIST_CACHE_CONTROL', 'public, no-cache')
+# Playlist writes only invalidate the worker that handled them, so by default playlists are not kept
+# in the response cache and every revalidation reads MongoDB. A TTL > 0 caches them, and other
+# workers may then answer 304 for the old playlist for up to that many seconds.
+PLAYLIST_RESPONSE_CACHE_TTL = int(os.environ.get('PLAYLIST_RESPONSE_CACHE_TTL', '0'))
+
 
 # ==================== AUTH ENDPOINTS ====================
 
 @api_router.post("/auth/session")
-async def create_user_session(request: Request, response: Response):
+async def create_user_session(request: Request, response: Response, db: Database):
     """Exchange session_id for session_token and create user"""
     try:
         body = await request.json()
@@ -64,8 +106,8 @@ async def create_user_session(request: Request, response: Response):
         # Create or update user
         user_id = await create_or_update_user(user_data)
         
-        # Create session in database
-        await create_session(user_id, session_token)
+        # Create session (a signed token replaces the upstream one when SESSION_MODE=signed)
+        session_token = await create_session(user_id, session_token)
         
         # Set session cookie
         set_session_cookie(response, session_token)
@@ -74,6 +116,9 @@ async def create_user_session(request: Request, response: Response):
         user = await db.users.find_one({"user_id": user_id}, {"_id": 0})
         return {"user": user, "session_token": session_token}
     
+    except HTTPException:
+        # e.g. 400 for a missing session_id, 503 when the auth service is unavailable
+        raise
     except Exception as e:
         logger.error(f"Session creation error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -102,142 +147,244 @@ async def logout(request: Request, response: Response):
 
 # ==================== SONG ENDPOINTS ====================
 
-@api_router.get("/songs", response_model=List[Song])
+# Song lists skip response_model validation: documents are written by our own endpoints,
+# and validating up to 100 songs per request costs more CPU than the query itself
+@api_router.get("/songs")
 async def get_songs(
+    db: Database,
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
     region: Optional[str] = None,
-    genre: Optional[str] = None
+    genre: Optional[str] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, max_length=500)
 ):
-    """Get all songs with filters"""
+    """Get all songs with filters, most played first (pass cursor, empty for page 1, to page by cursor)"""
     query = {}
     if region and region != "global":
         query["region"] = region
     if genre:
         query["genre"] = genre
     
-    songs = await db.songs.find(query, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
-    return songs
+    songs, next_cursor = await fetch_page(
+        db.songs, query, "plays", limit, cursor=cursor, skip=skip, projection=song_projection(fields)
+    )
+    if cursor is None:
+        return ORJSONResponse(songs)
+    return ORJSONResponse({"items": songs, "next_cursor": next_cursor})
+
+
+async def _text_search(collection, q: str, limit: int, projection: dict) -> list:
+    """Relevance-ranked lookup on a collection's weighted text index"""
+    return await collection.find(
+        {"$text": {"$search": q}},
+        projection
+    ).sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(limit)
+
+
+async def _prefix_search(collection, id_field: str, ids: List[str], projection: dict) -> list:
+    """Documents for prefix index matches, in suggestion order"""
+    if not ids:
+        return []
+    docs = await collection.find({id_field: {"$in": ids}}, projection).to_list(len(ids))
+    by_id = {doc[id_field]: doc for doc in docs}
+    return [by_id[doc_id] for doc_id in ids if doc_id in by_id]
+
+
+# /songs/search targets: result key -> (suggest doc type, id field, limit, projection)
+SEARCH_TARGETS = {
+    "songs": ("song", "song_id", 10, SONG_CARD_PROJECTION),
+    "playlists": ("playlist", "playlist_id", 5, {"_id": 0}),
+    "artists": ("artist", "artist_id", 5, {"_id": 0})
+}
 
 
 @api_router.get("/songs/search")
-async def search_songs(q: str = Query(..., min_length=1)):
+async def search_songs(db: Database, q: str = Query(..., min_length=1, max_length=200)):
     """Search songs, artists, and playlists"""
-    query_regex = {"$regex": q, "$options": "i"}
-    
-    # Search songs
-    songs = await db.songs.find({
-        "$or": [
-            {"title": query_regex},
-            {"artist": query_regex},
-            {"album": query_regex}
-        ]
-    }, {"_id": 0}).limit(10).to_list(10)
-    
-    # Search playlists
-    playlists = await db.playlists.find({
-        "$or": [
-            {"name": query_regex},
-            {"description": query_regex}
-        ]
-    }, {"_id": 0}).limit(5).to_list(5)
-    
-    # Search artists
-    artists = await db.artists.find({
-        "name": query_regex
-    }, {"_id": 0}).limit(5).to_list(5)
-    
-    return {
-        "songs": songs,
-        "playlists": playlists,
-        "artists": artists
-    }
+    # The three collections are searched concurrently, each through its text index
+    found = await asyncio.gather(*(
+        _text_search(db[name], q, limit, projection) for name, (_, _, limit, projection) in SEARCH_TARGETS.items()
+    ))
+    results = dict(zip(SEARCH_TARGETS, found))
+
+    # $text only matches whole words, so a partially typed one ("bli") falls back to the prefix index
+    missing = [name for name, docs in results.items() if not docs]
+    if missing:
+        suggestions = suggest_index.suggest(q, 20)
+        lookups = []
+        for name in missing:
+            doc_type, id_field, limit, projection = SEARCH_TARGETS[name]
+            ids = [doc["id"] for doc in suggestions if doc["type"] == doc_type][:limit]
+            lookups.append(_prefix_search(db[name], id_field, ids, projection))
+        results.update(zip(missing, await asyncio.gather(*lookups)))
+
+    return results
+
+
+@api_router.get("/songs/suggest")
+async def suggest(q: str = Query(..., min_length=1, max_length=100), limit: int = Query(10, ge=1, le=20)):
+    """Search-as-you-type suggestions for song titles, artists and playlists"""
+    return {"suggestions": suggest_index.suggest(q, limit)}
 
 
 @api_router.get("/songs/{song_id}")
-async def get_song(song_id: str):
+async def get_song(song_id: str, request: Request, db: Database):
     """Get song by ID"""
-    song = await db.songs.find_one({"song_id": song_id}, {"_id": 0})
-    if not song:
+    async def load():
+        song = await db.songs.find_one({"song_id": song_id}, {"_id": 0})
+        if not song:
+            raise HTTPException(status_code=404, detail="Song not found")
+        return song
+
+    return await response_cache.respond(
+        request, ("song", song_id), [f"song:{song_id}"], load, CATALOG_CACHE_CONTROL
+    )
+
+
+# Known regions and song IDs, so plays can't create chart rows for songs or regions that don't exist
+catalog_regions = RefreshingCache(1, int(os.environ.get('CATALOG_REGIONS_TTL', '300')), max_stale=3600)
+# Songs found by lookup; those loaded into the suggest index at startup never need one
+known_songs = TTLCache(int(os.environ.get('KNOWN_SONGS_MAXSIZE', '50000')), int(os.environ.get('KNOWN_SONGS_TTL', '3600')))
+
+
+async def _load_regions(db) -> set:
+    return {"global", *(region.lower() for region in await db.songs.distinct("region") if region)}
+
+
+async def _validate_play(db, song_id: str, region: str):
+    regions = await catalog_regions.get("regions", lambda: _load_regions(db))
+    if region not in regions:
+        raise HTTPException(status_code=400, detail="Unknown region")
+    if suggest_index.has("song", song_id) or known_songs.get(song_id):
+        return
+    if not await db.songs.find_one({"song_id": song_id}, {"_id": 1}):
         raise HTTPException(status_code=404, detail="Song not found")
-    return song
+    known_songs.set(song_id, True)
 
 
 @api_router.post("/songs/{song_id}/play")
-async def track_play(song_id: str, request: Request):
+async def track_play(song_id: str, request: Request, db: Database, region: str = Query("global", max_length=50)):
     """Track song play"""
-    # Increment play count
-    await db.songs.update_one(
-        {"song_id": song_id},
-        {"$inc": {"plays": 1}}
-    )
+    region = region.lower()
+    await _validate_play(db, song_id, region)
+
+    # Anonymous plays skip the user lookup
+    user_id = await get_session_user_id(request)
+    
+    # Increment play count and log the play for charts (buffered and flushed to MongoDB in bulk)
+    play_counter.record(song_id, user_id=user_id, region=region)
     
     # Add to user's recently played (if authenticated)
-    try:
-        user = await get_user_from_session(request)
-        recently_played = user.get("recently_played", [])
-        
-        # Remove if already exists, then add to front
-        if song_id in recently_played:
-            recently_played.remove(song_id)
-        recently_played.insert(0, song_id)
-        
-        # Keep only last 20
-        recently_played = recently_played[:20]
-        
+    if user_id:
+        # Move the song to the front and keep the last RECENTLY_PLAYED_LIMIT in one atomic update
         await db.users.update_one(
-            {"user_id": user["user_id"]},
-            {"$set": {"recently_played": recently_played}}
+            {"user_id": user_id},
+            [{"$set": {"recently_played": {"$slice": [
+                {"$concatArrays": [
+                    {"$literal": [song_id]},
+                    {"$filter": {
+                        "input": {"$ifNull": ["$recently_played", []]},
+                        "cond": {"$ne": ["$$this", {"$literal": song_id}]}
+                    }}
+                ]},
+                RECENTLY_PLAYED_LIMIT
+            ]}}}]
         )
-    except:
-        pass  # Anonymous play tracking
+        invalidate_user_cache(user_id)
     
     return {"message": "Play tracked"}
 
 
 @api_router.get("/songs/{song_id}/lyrics")
-async def get_lyrics(song_id: str):
+async def get_lyrics(song_id: str, request: Request, db: Database):
     """Get karaoke lyrics for a song"""
-    song = await db.songs.find_one({"song_id": song_id}, {"_id": 0, "lyrics": 1})
-    if not song:
-        raise HTTPException(status_code=404, detail="Song not found")
-    return {"lyrics": song.get("lyrics", [])}
+    async def load():
+        song = await db.songs.find_one({"song_id": song_id}, {"_id": 0, "lyrics": 1})
+        if not song:
+            raise HTTPException(status_code=404, detail="Song not found")
+        return {"lyrics": song.get("lyrics", [])}
+
+    return await response_cache.respond(
+        request, ("lyrics", song_id), [f"song:{song_id}"], load, CATALOG_CACHE_CONTROL
+    )
 
 
 # ==================== PLAYLIST ENDPOINTS ====================
 
-@api_router.get("/playlists", response_model=List[Playlist])
+@api_router.get("/playlists")
 async def get_playlists(
+    db: Database,
     skip: int = Query(0, ge=0),
-    limit: int = Query(20, ge=1, le=100)
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
 ):
-    """Get all public playlists"""
-    playlists = await db.playlists.find(
-        {"is_public": True},
-        {"_id": 0}
-    ).skip(skip).limit(limit).to_list(limit)
-    return playlists
+    """Get all public playlists, most followed first (pass cursor, empty for page 1, to page by cursor)"""
+    playlists, next_cursor = await fetch_page(
+        db.playlists, {"is_public": True}, "followers", limit, cursor=cursor, skip=skip
+    )
+    if cursor is None:
+        return ORJSONResponse(playlists)
+    return ORJSONResponse({"items": playlists, "next_cursor": next_cursor})
+
+
+def _playlist_pipeline(playlist_id: str, song_offset: int, song_limit: int, song_fields: dict) -> list:
+    """Playlist with one page of its songs (song_fields projection), in playlist order"""
+    return [
+        {"$match": {"playlist_id": playlist_id}},
+        {"$set": {
+            "song_total": {"$size": {"$ifNull": ["$songs", []]}},
+            "page_ids": {"$slice": [{"$ifNull": ["$songs", []]}, song_offset, song_limit]}
+        }},
+        {"$lookup": {"from": "songs", "localField": "page_ids", "foreignField": "song_id", "as": "found"}},
+        # $lookup returns matches in arbitrary order; rebuild the page in playlist order,
+        # skipping songs that no longer exist
+        {"$set": {"song_details": {"$map": {
+            "input": {"$filter": {"input": "$page_ids", "cond": {"$in": ["$$this", "$found.song_id"]}}},
+            "as": "song_id",
+            "in": {"$arrayElemAt": [
+                {"$filter": {"input": "$found", "as": "song", "cond": {"$eq": ["$$song.song_id", "$$song_id"]}}}, 0
+            ]}
+        }}}},
+        # songs is cut to this page's IDs; song_total still counts the whole playlist
+        {"$project": {
+            "_id": 0,
+            **{field: 1 for field in Playlist.model_fields if field != "songs"},
+            "songs": "$page_ids",
+            "song_total": 1,
+            **{f"song_details.{field}": 1 for field, keep in song_fields.items() if keep and field != "_id"}
+        }}
+    ]
 
 
 @api_router.get("/playlists/{playlist_id}")
-async def get_playlist(playlist_id: str):
-    """Get playlist by ID"""
-    playlist = await db.playlists.find_one({"playlist_id": playlist_id}, {"_id": 0})
-    if not playlist:
-        raise HTTPException(status_code=404, detail="Playlist not found")
-    
-    # Get songs in playlist
-    song_ids = playlist.get("songs", [])
-    songs = await db.songs.find(
-        {"song_id": {"$in": song_ids}},
-        {"_id": 0}
-    ).to_list(len(song_ids))
-    
-    return {**playlist, "song_details": songs}
+async def get_playlist(
+    playlist_id: str,
+    request: Request,
+    db: Database,
+    song_offset: int = Query(0, ge=0),
+    song_limit: int = Query(100, ge=1, le=500),
+    fields: Optional[str] = Query(None, max_length=500)
+):
+    """Get playlist by ID with a page of its songs (song_offset/song_limit; song_total is the full count)"""
+    song_fields = song_projection(fields)
+
+    async def load():
+        playlists = await db.playlists.aggregate(
+            _playlist_pipeline(playlist_id, song_offset, song_limit, song_fields)
+        ).to_list(1)
+        if not playlists:
+            raise HTTPException(status_code=404, detail="Playlist not found")
+        return playlists[0]
+
+    return await response_cache.respond(
+        request, ("playlist", playlist_id, song_offset, song_limit, fields), [f"playlist:{playlist_id}"], load,
+        PLAYLIST_CACHE_CONTROL, ttl=PLAYLIST_RESPONSE_CACHE_TTL
+    )
 
 
 @api_router.post("/playlists", response_model=Playlist)
-async def create_playlist(playlist: PlaylistCreate, request: Request):
+async def create_playlist(playlist: PlaylistCreate, request: Request, db: Database):
     """Create new playlist"""
     user = await get_user_from_session(request)
     
@@ -260,18 +407,19 @@ async def create_playlist(playlist: PlaylistCreate, request: Request):
     
     await db.playlists.insert_one(new_playlist)
     
-    # Add to user's playlists
-    await db.users.update_one(
-        {"user_id": user["user_id"]},
-        {"$push": {"playlists": playlist_id}}
+    # Add to user's library
+    await db.library_playlists.insert_one(
+        {"user_id": user["user_id"], "playlist_id": playlist_id, "added_at": now}
     )
+    if new_playlist["is_public"]:
+        suggest_index.upsert(playlist_doc(new_playlist))
     
     new_playlist.pop("_id", None)
     return new_playlist
 
 
 @api_router.put("/playlists/{playlist_id}")
-async def update_playlist(playlist_id: str, update: PlaylistUpdate, request: Request):
+async def update_playlist(playlist_id: str, update: PlaylistUpdate, request: Request, db: Database):
     """Update playlist"""
     user = await get_user_from_session(request)
     
@@ -291,11 +439,18 @@ async def update_playlist(playlist_id: str, update: PlaylistUpdate, request: Req
         {"$set": update_dict}
     )
     
+    response_cache.invalidate(f"playlist:{playlist_id}")
+    playlist.update(update_dict)
+    if playlist["is_public"]:
+        suggest_index.upsert(playlist_doc(playlist))
+    else:
+        suggest_index.remove("playlist", playlist_id)
+    
     return {"message": "Playlist updated"}
 
 
 @api_router.delete("/playlists/{playlist_id}")
-async def delete_playlist(playlist_id: str, request: Request):
+async def delete_playlist(playlist_id: str, request: Request, db: Database):
     """Delete playlist"""
     user = await get_user_from_session(request)
     
@@ -307,18 +462,17 @@ async def delete_playlist(playlist_id: str, request: Request):
         raise HTTPException(status_code=403, detail="Not authorized")
     
     await db.playlists.delete_one({"playlist_id": playlist_id})
+    response_cache.invalidate(f"playlist:{playlist_id}")
+    suggest_index.remove("playlist", playlist_id)
     
-    # Remove from user's playlists
-    await db.users.update_one(
-        {"user_id": user["user_id"]},
-        {"$pull": {"playlists": playlist_id}}
-    )
+    # Remove from every library it was in
+    await db.library_playlists.delete_many({"playlist_id": playlist_id})
     
     return {"message": "Playlist deleted"}
 
 
 @api_router.post("/playlists/{playlist_id}/songs")
-async def add_song_to_playlist(playlist_id: str, song_id: str, request: Request):
+async def add_song_to_playlist(playlist_id: str, song_id: str, request: Request, db: Database):
     """Add song to playlist"""
     user = await get_user_from_session(request)
     
@@ -339,12 +493,13 @@ async def add_song_to_playlist(playlist_id: str, song_id: str, request: Request)
         {"playlist_id": playlist_id},
         {"$addToSet": {"songs": song_id}}
     )
+    response_cache.invalidate(f"playlist:{playlist_id}")
     
     return {"message": "Song added to playlist"}
 
 
 @api_router.delete("/playlists/{playlist_id}/songs/{song_id}")
-async def remove_song_from_playlist(playlist_id: str, song_id: str, request: Request):
+async def remove_song_from_playlist(playlist_id: str, song_id: str, request: Request, db: Database):
     """Remove song from playlist"""
     user = await get_user_from_session(request)
     
@@ -360,82 +515,251 @@ async def remove_song_from_playlist(playlist_id: str, song_id: str, request: Req
         {"playlist_id": playlist_id},
         {"$pull": {"songs": song_id}}
     )
+    response_cache.invalidate(f"playlist:{playlist_id}")
     
     return {"message": "Song removed from playlist"}
 
 
-# ==================== USER LIBRARY ENDPOINTS ====================
+def _unique(song_ids: List[str]) -> List[str]:
+    """Drop repeated IDs, keeping first occurrences in order"""
+    return list(dict.fromkeys(song_ids))
 
-@api_router.get("/library/liked-songs")
-async def get_liked_songs(request: Request):
-    """Get user's liked songs"""
+
+# Guarded pushes retried by songs:batch-add while concurrent edits keep invalidating them
+BATCH_ADD_ATTEMPTS = 3
+
+
+async def _existing_song_ids(db, song_ids: List[str]) -> set:
+    """Which of song_ids exist, in one $in query"""
+    songs = await db.songs.find({"song_id": {"$in": song_ids}}, {"_id": 0, "song_id": 1}).to_list(len(song_ids))
+    return {song["song_id"] for song in songs}
+
+
+async def _get_owned_playlist(db, playlist_id: str, user_id: str) -> dict:
+    """Playlist song list after checking the caller owns it"""
+    playlist = await db.playlists.find_one({"playlist_id": playlist_id}, {"_id": 0, "owner": 1, "songs": 1})
+    if not playlist:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    if playlist["owner"] != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return playlist
+
+
+@api_router.post("/playlists/{playlist_id}/songs:batch-add")
+async def add_songs_to_playlist(playlist_id: str, batch: PlaylistSongsBatchAdd, request: Request, db: Database):
+    """Add many songs to a playlist in request order (at position, or appended)"""
+    user = await get_user_from_session(request)
+    
+    song_ids = _unique(batch.song_ids)
+    playlist, existing = await asyncio.gather(
+        _get_owned_playlist(db, playlist_id, user["user_id"]),
+        _existing_song_ids(db, song_ids)
+    )
+    for _ in range(BATCH_ADD_ATTEMPTS):
+        in_playlist = set(playlist.get("songs", []))
+        to_add = [sid for sid in song_ids if sid in existing and sid not in in_playlist]
+        if not to_add:
+            break
+        push = {"$each": to_add}
+        if batch.position is not None:
+            push["$position"] = batch.position
+        # The $nin guard keeps a concurrent edit from creating duplicates
+        result = await db.playlists.update_one(
+            {"playlist_id": playlist_id, "songs": {"$nin": to_add}},
+            {"$push": {"songs": push}}
+        )
+        if result.modified_count:
+            response_cache.invalidate(f"playlist:{playlist_id}")
+            break
+        # Someone added one of these songs meanwhile; re-read so positions and statuses stay exact
+        playlist = await _get_owned_playlist(db, playlist_id, user["user_id"])
+    else:
+        raise HTTPException(status_code=409, detail="Playlist is being modified concurrently, please retry")
+    
+    added = set(to_add)
+    results = []
+    for sid in batch.song_ids:
+        if sid in added:
+            results.append({"song_id": sid, "status": "added"})
+            added.discard(sid)
+        elif sid not in existing:
+            results.append({"song_id": sid, "status": "not_found"})
+        else:
+            results.append({"song_id": sid, "status": "already_in_playlist"})
+    return {"added": len(to_add), "results": results}
+
+
+@api_router.post("/playlists/{playlist_id}/songs:batch-remove")
+async def remove_songs_from_playlist(playlist_id: str, batch: SongBatchRequest, request: Request, db: Database):
+    """Remove many songs from a playlist"""
     user = await get_user_from_session(request)
-    song_ids = user.get("liked_songs", [])
     
+    playlist = await _get_owned_playlist(db, playlist_id, user["user_id"])
+    in_playlist = set(playlist.get("songs", []))
+    to_remove = [sid for sid in _unique(batch.song_ids) if sid in in_playlist]
+    
+    if to_remove:
+        await db.playlists.update_one(
+            {"playlist_id": playlist_id},
+            {"$pull": {"songs": {"$in": to_remove}}}
+        )
+        response_cache.invalidate(f"playlist:{playlist_id}")
+    
+    removed = set(to_remove)
+    results = []
+    for sid in batch.song_ids:
+        if sid in removed:
+            results.append({"song_id": sid, "status": "removed"})
+            removed.discard(sid)
+        else:
+            results.append({"song_id": sid, "status": "not_in_playlist"})
+    return {"removed": len(to_remove), "results": results}
+
+
+# ==================== USER LIBRARY ENDPOINTS ====================
+
+async def _songs_in_order(db, song_ids: List[str], projection: dict = SONG_CARD_PROJECTION) -> list:
+    """Fetch songs by ID, returned in the order of song_ids"""
     songs = await db.songs.find(
         {"song_id": {"$in": song_ids}},
-        {"_id": 0}
+        projection
     ).to_list(len(song_ids))
     
-    return songs
+    songs_dict = {s["song_id"]: s for s in songs}
+    return [songs_dict[sid] for sid in song_ids if sid in songs_dict]
+
+
+@api_router.get("/library/liked-songs")
+async def get_liked_songs(
+    request: Request,
+    db: Database,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, max_length=500)
+):
+    """Get user's liked songs, most recently liked first (pass cursor, empty for page 1, to page by cursor)"""
+    user = await get_user_from_session(request)
+    
+    likes, next_cursor = await fetch_page(
+        db.liked_songs, {"user_id": user["user_id"]}, "liked_at", limit, cursor=cursor,
+        projection={"song_id": 1, "liked_at": 1}
+    )
+    liked_at = {like["song_id"]: like["liked_at"] for like in likes}
+    songs = await _songs_in_order(db, [like["song_id"] for like in likes], song_projection(fields))
+    songs = [{**song, "liked_at": liked_at[song["song_id"]]} for song in songs]
+    
+    if cursor is None:
+        return ORJSONResponse(songs)
+    return ORJSONResponse({"items": songs, "next_cursor": next_cursor})
 
 
 @api_router.post("/library/liked-songs/{song_id}")
-async def like_song(song_id: str, request: Request):
+async def like_song(song_id: str, request: Request, db: Database):
     """Like a song"""
     user = await get_user_from_session(request)
     
-    await db.users.update_one(
-        {"user_id": user["user_id"]},
-        {"$addToSet": {"liked_songs": song_id}}
+    # Liking twice keeps the original liked_at
+    await db.liked_songs.update_one(
+        {"user_id": user["user_id"], "song_id": song_id},
+        {"$setOnInsert": {"liked_at": datetime.now(timezone.utc)}},
+        upsert=True
     )
     
     return {"message": "Song liked"}
 
 
 @api_router.delete("/library/liked-songs/{song_id}")
-async def unlike_song(song_id: str, request: Request):
+async def unlike_song(song_id: str, request: Request, db: Database):
     """Unlike a song"""
     user = await get_user_from_session(request)
     
-    await db.users.update_one(
-        {"user_id": user["user_id"]},
-        {"$pull": {"liked_songs": song_id}}
-    )
+    await db.liked_songs.delete_one({"user_id": user["user_id"], "song_id": song_id})
     
     return {"message": "Song unliked"}
 
 
+@api_router.post("/library/liked-songs:batch-add")
+async def like_songs(batch: SongBatchRequest, request: Request, db: Database):
+    """Like many songs; later songs in the list count as more recently liked"""
+    user = await get_user_from_session(request)
+    
+    song_ids = _unique(batch.song_ids)
+    existing = await _existing_song_ids(db, song_ids)
+    to_like = [sid for sid in song_ids if sid in existing]
+    
+    newly_liked = set()
+    if to_like:
+        now = datetime.now(timezone.utc)
+        result = await db.liked_songs.bulk_write([
+            UpdateOne(
+                {"user_id": user["user_id"], "song_id": sid},
+                # 1ms apart so liked_at keeps the request order
+                {"$setOnInsert": {"liked_at": now - timedelta(milliseconds=len(to_like) - i)}},
+                upsert=True
+            )
+            for i, sid in enumerate(to_like)
+        ], ordered=False)
+        newly_liked = {to_like[i] for i in result.upserted_ids}
+    
+    results = []
+    for sid in batch.song_ids:
+        if sid in newly_liked:
+            results.append({"song_id": sid, "status": "liked"})
+            newly_liked.discard(sid)
+        elif sid not in existing:
+            results.append({"song_id": sid, "status": "not_found"})
+        else:
+            results.append({"song_id": sid, "status": "already_liked"})
+    return {"liked": sum(r["status"] == "liked" for r in results), "results": results}
+
+
+@api_router.post("/library/liked-songs:batch-remove")
+async def unlike_songs(batch: SongBatchRequest, request: Request, db: Database):
+    """Unlike many songs"""
+    user = await get_user_from_session(request)
+    
+    song_ids = _unique(batch.song_ids)
+    query = {"user_id": user["user_id"], "song_id": {"$in": song_ids}}
+    liked = await db.liked_songs.find(query, {"_id": 0, "song_id": 1}).to_list(len(song_ids))
+    removed = {like["song_id"] for like in liked}
+    if removed:
+        await db.liked_songs.delete_many(query)
+    
+    results = []
+    for sid in batch.song_ids:
+        if sid in removed:
+            results.append({"song_id": sid, "status": "unliked"})
+            removed.discard(sid)
+        else:
+            results.append({"song_id": sid, "status": "not_liked"})
+    return {"unliked": sum(r["status"] == "unliked" for r in results), "results": results}
+
+
 @api_router.get("/library/playlists")
-async def get_user_playlists(request: Request):
-    """Get user's playlists"""
+async def get_user_playlists(request: Request, db: Database, limit: int = Query(200, ge=1, le=1000)):
+    """Get user's playlists, most recently added first"""
     user = await get_user_from_session(request)
-    playlist_ids = user.get("playlists", [])
+    
+    memberships = await db.library_playlists.find(
+        {"user_id": user["user_id"]},
+        {"_id": 0, "playlist_id": 1}
+    ).sort("added_at", -1).limit(limit).to_list(limit)
+    playlist_ids = [m["playlist_id"] for m in memberships]
     
     playlists = await db.playlists.find(
         {"playlist_id": {"$in": playlist_ids}},
         {"_id": 0}
     ).to_list(len(playlist_ids))
     
-    return playlists
+    playlists_dict = {p["playlist_id"]: p for p in playlists}
+    return [playlists_dict[pid] for pid in playlist_ids if pid in playlists_dict]
 
 
 @api_router.get("/library/recently-played")
-async def get_recently_played(request: Request):
+async def get_recently_played(request: Request, db: Database, fields: Optional[str] = Query(None, max_length=500)):
     """Get recently played songs"""
     user = await get_user_from_session(request)
-    song_ids = user.get("recently_played", [])
-    
-    songs = await db.songs.find(
-        {"song_id": {"$in": song_ids}},
-        {"_id": 0}
-    ).to_list(len(song_ids))
-    
-    # Sort by recently played order
-    songs_dict = {s["song_id"]: s for s in songs}
-    ordered_songs = [songs_dict[sid] for sid in song_ids if sid in songs_dict]
-    
-    return ordered_songs
+    return await _songs_in_order(db, user.get("recently_played", []), song_projection(fields))
 
 
 # ==================== YOUTUBE ENDPOINTS ====================
@@ -460,6 +784,17 @@ async def get_video(video_id: str):
     return video
 
 
+@api_router.post("/youtube/videos:batch")
+async def get_videos_batch(batch: YouTubeVideoBatchRequest):
+    """Get details for many YouTube videos in input order"""
+    try:
+        videos = await get_youtube_videos_bulk(batch.video_ids)
+        return {"videos": videos}
+    except Exception as e:
+        logger.error(f"YouTube batch lookup error: {str(e)}")
+        raise HTTPException(status_code=500, detail="YouTube lookup failed")
+
+
 @api_router.get("/youtube/related/{video_id}")
 async def get_related(video_id: str, max_results: int = Query(5, ge=1, le=20)):
     """Get related videos"""
@@ -467,38 +802,174 @@ async def get_related(video_id: str, max_results: int = Query(5, ge=1, le=20)):
     return {"videos": videos}
 
 
+# ==================== HOME ENDPOINTS ====================
+
+# Non-personal home sections per region; stale feeds are served while a refresh runs
+home_cache = RefreshingCache(64, int(os.environ.get('HOME_CACHE_TTL', '30')), max_stale=300)
+
+
+async def _build_home_feed(db, region: str) -> dict:
+    query = {} if region == "global" else {"region": region}
+    (songs, _), (playlists, _) = await asyncio.gather(
+        fetch_page(db.songs, query, "plays", 20, projection=SONG_CARD_PROJECTION),
+        fetch_page(db.playlists, {"is_public": True}, "followers", 10)
+    )
+    return {"songs": songs, "playlists": playlists}
+
+
+async def _get_home_recently_played(db, request: Request) -> list:
+    try:
+        user = await get_user_from_session(request)
+    except HTTPException:
+        return []  # Anonymous visitor
+    return await _songs_in_order(db, user.get("recently_played", []))
+
+
+@api_router.get("/home")
+async def get_home(request: Request, db: Database, region: str = Query("global", max_length=50)):
+    """Get everything the home page shows in one call"""
+    feed, recently_played = await asyncio.gather(
+        home_cache.get(region, lambda: _build_home_feed(db, region)),
+        _get_home_recently_played(db, request)
+    )
+    return ORJSONResponse({**feed, "recently_played": recently_played})
+
+
+# ==================== CHART ENDPOINTS ====================
+
+# Chart windows: period -> (rollup collection, window)
+CHART_PERIODS = {
+    "day": ("play_counts_hourly", timedelta(hours=24)),
+    "week": ("play_counts_daily", timedelta(days=7)),
+    "month": ("play_counts_daily", timedelta(days=30))
+}
+chart_cache = TTLCache(256, int(os.environ.get('CHART_CACHE_TTL', '60')))
+
+
+@api_router.get("/charts")
+async def get_charts(
+    db: Database,
+    region: str = Query("global", max_length=50),
+    period: str = Query("week", pattern="^(day|week|month)$"),
+    limit: int = Query(50, ge=1, le=100)
+):
+    """Get the most played songs in a region over a recent period"""
+    region = region.lower()
+    cache_key = (region, period, limit)
+    cached = chart_cache.get(cache_key)
+    if cached is not None:
+        return ORJSONResponse(cached)
+    
+    # Read precomputed per-region counters instead of scanning play events
+    collection, window = CHART_PERIODS[period]
+    since = datetime.now(timezone.utc) - window
+    top = await db[collection].aggregate([
+        {"$match": {"region": region, "bucket": {"$gte": since}}},
+        {"$group": {"_id": "$song_id", "plays": {"$sum": "$plays"}}},
+        {"$sort": {"plays": -1, "_id": 1}},
+        {"$limit": limit}
+    ]).to_list(limit)
+    
+    song_ids = [entry["_id"] for entry in top]
+    songs = await db.songs.find(
+        {"song_id": {"$in": song_ids}},
+        SONG_CARD_PROJECTION
+    ).to_list(len(song_ids))
+    
+    # Keep chart order
+    songs_dict = {s["song_id"]: s for s in songs}
+    chart = [
+        {**songs_dict[entry["_id"]], "chart_plays": entry["plays"]}
+        for entry in top if entry["_id"] in songs_dict
+    ]
+    
+    result = {"region": region, "period": period, "songs": chart}
+    chart_cache.set(cache_key, result)
+    return ORJSONResponse(result)
+
+
 # ==================== ARTIST ENDPOINTS ====================
 
 @api_router.get("/artists")
-async def get_artists(skip: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=100)):
-    """Get all artists"""
-    artists = await db.artists.find({}, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
-    return artists
+async def get_artists(
+    db: Database,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Get all artists, most followed first (pass cursor, empty for page 1, to page by cursor)"""
+    artists, next_cursor = await fetch_page(db.artists, {}, "followers", limit, cursor=cursor, skip=skip)
+    if cursor is None:
+        return ORJSONResponse(artists)
+    return ORJSONResponse({"items": artists, "next_cursor": next_cursor})
 
 
 @api_router.get("/artists/{artist_id}")
-async def get_artist(artist_id: str):
+async def get_artist(artist_id: str, request: Request, db: Database):
     """Get artist by ID"""
-    artist = await db.artists.find_one({"artist_id": artist_id}, {"_id": 0})
-    if not artist:
-        raise HTTPException(status_code=404, detail="Artist not found")
-    return artist
+    async def load():
+        artist = await db.artists.find_one({"artist_id": artist_id}, {"_id": 0})
+        if not artist:
+            raise HTTPException(status_code=404, detail="Artist not found")
+        return artist
+
+    return await response_cache.respond(
+        request, ("artist", artist_id), [f"artist:{artist_id}"], load, CATALOG_CACHE_CONTROL
+    )
 
 
 @api_router.get("/artists/{artist_id}/top-songs")
-async def get_artist_top_songs(artist_id: str):
+async def get_artist_top_songs(
+    artist_id: str,
+    request: Request,
+    db: Database,
+    fields: Optional[str] = Query(None, max_length=500)
+):
     """Get artist's top songs"""
-    artist = await db.artists.find_one({"artist_id": artist_id}, {"_id": 0})
-    if not artist:
-        raise HTTPException(status_code=404, detail="Artist not found")
-    
-    song_ids = artist.get("top_songs", [])
-    songs = await db.songs.find(
-        {"song_id": {"$in": song_ids}},
-        {"_id": 0}
-    ).to_list(len(song_ids))
-    
-    return songs
+    song_fields = song_projection(fields)
+
+    async def load():
+        artist = await db.artists.find_one({"artist_id": artist_id}, {"_id": 0})
+        if not artist:
+            raise HTTPException(status_code=404, detail="Artist not found")
+        
+        song_ids = artist.get("top_songs", [])
+        return await db.songs.find(
+            {"song_id": {"$in": song_ids}},
+            song_fields
+        ).to_list(len(song_ids))
+
+    return await response_cache.respond(
+        request, ("artist-top-songs", artist_id, fields), [f"artist:{artist_id}"], load, CATALOG_CACHE_CONTROL
+    )
+
+
+# ==================== METRICS ENDPOINTS ====================
+
+# Metrics expose quota, cache and pool internals: the endpoint is off (404) unless a token is configured
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+
+@api_router.get("/metrics")
+async def get_metrics(request: Request):
+    """Get in-process cache, buffer and quota metrics (Authorization: Bearer METRICS_TOKEN)"""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    auth_header = request.headers.get("Authorization", "")
+    if not secrets.compare_digest(auth_header.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return {
+        "auth_cache": get_auth_cache_stats(),
+        "play_counter": play_counter.stats(),
+        "home_cache": home_cache.stats(),
+        "catalog_regions": catalog_regions.stats(),
+        "known_songs": known_songs.stats(),
+        "mongo_pool": get_pool_stats(),
+        "response_cache": response_cache.stats(),
+        "suggest_index": suggest_index.stats(),
+        "youtube_cache": get_cache_stats(),
+        "youtube_quota": get_quota_stats()
+    }
 
 
 # Include the router in the main app
@@ -520,8 +991,3 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
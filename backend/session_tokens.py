@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PREFIX = "v1"
+SYNC_OVERLAP_SECONDS = 30
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def parse_signing_keys(value: str) -> List[Tuple[str, bytes]]:
+    """Parse "kid:secret,kid:secret"; the first key signs, all of them verify"""
+    keys = []
+    for item in value.split(","):
+        kid, sep, secret = item.strip().partition(":")
+        if kid and sep and secret:
+            keys.append((kid, secret.encode()))
+    return keys
+
+
+class SessionSigner:
+    """Issues and verifies HMAC-SHA256 signed session tokens carrying user_id and expiry"""
+
+    def __init__(self, keys: List[Tuple[str, bytes]]):
+        self.keys: Dict[str, bytes] = dict(keys)
+        self.active_kid = keys[0][0] if keys else None
+
+    def sign(self, user_id: str, expires_at: datetime) -> str:
+        """Token "v1.<kid>.<claims>.<signature>" with a random jti for revocation"""
+        claims = {"uid": user_id, "exp": int(expires_at.timestamp()), "jti": secrets.token_urlsafe(12)}
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        signing_input = f"{TOKEN_PREFIX}.{self.active_kid}.{payload}"
+        signature = hmac.new(self.keys[self.active_kid], signing_input.encode(), hashlib.sha256).digest()
+        return f"{signing_input}.{_b64encode(signature)}"
+
+    def verify(self, token: str) -> Optional[dict]:
+        """Claims of a well-signed, unexpired token ({user_id, expires_at, jti}), else None"""
+        parts = token.split(".")
+        if len(parts) != 4 or parts[0] != TOKEN_PREFIX:
+            return None
+        _, kid, payload, signature = parts
+        key = self.keys.get(kid)
+        if key is None:
+            return None  # Unknown or retired key
+
+        expected = hmac.new(key, f"{TOKEN_PREFIX}.{kid}.{payload}".encode(), hashlib.sha256).digest()
+        try:
+            if not hmac.compare_digest(expected, _b64decode(signature)):
+                return None
+            claims = json.loads(_b64decode(payload))
+            exp, user_id, jti = int(claims["exp"]), claims["uid"], claims["jti"]
+        except (ValueError, TypeError, KeyError):
+            return None
+
+        if exp <= time.time():
+            return None
+        return {"user_id": user_id, "expires_at": datetime.fromtimestamp(exp, timezone.utc), "jti": jti}
+
+
+def is_signed_token(token: str) -> bool:
+    return token.startswith(f"{TOKEN_PREFIX}.")
+
+
+class RevocationList:
+    """In-memory copy of the revoked-token denylist, refreshed from MongoDB at most every refresh_interval"""
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._revoked: Dict[str, datetime] = {}  # jti -> token expiry
+        self._synced_until: Optional[datetime] = None
+        self._last_refresh = 0.0
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+
+    async def _refresh(self, collection):
+        query = {} if self._synced_until is None else {"revoked_at": {"$gte": self._synced_until}}
+        started = datetime.now(timezone.utc)
+        async for doc in collection.find(query, {"_id": 0, "jti": 1, "expires_at": 1}):
+            expires_at = doc["expires_at"]
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            self._revoked[doc["jti"]] = expires_at
+        # Entries for tokens that have expired anyway can be forgotten
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > started}
+        # Overlap the next window to tolerate clock skew between workers and in-flight writes
+        self._synced_until = started - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+        self._last_refresh = time.monotonic()
+        self.refreshes += 1
+
+    async def is_revoked(self, collection, jti: str) -> bool:
+        """Check jti against the denylist; MongoDB is read once per refresh_interval, not per request"""
+        if time.monotonic() - self._last_refresh >= self.refresh_interval:
+            async with self._lock:
+                if time.monotonic() - self._last_refresh >= self.refresh_interval:
+                    try:
+                        await self._refresh(collection)
+                    except Exception as e:
+                        # Keep serving from the last known denylist
+                        logger.error(f"Revocation list refresh failed: {str(e)}")
+                        self._last_refresh = time.monotonic()
+        return jti in self._revoked
+
+    async def revoke(self, collection, jti: str, expires_at: datetime):
+        """Add a token to the denylist (this worker sees it immediately, others on their next refresh)"""
+        self._revoked[jti] = expires_at
+        try:
+            await collection.insert_one(
+                {"jti": jti, "expires_at": expires_at, "revoked_at": datetime.now(timezone.utc)}
+            )
+        except DuplicateKeyError:
+            pass  # Already revoked
+
+    def stats(self) -> dict:
+        return {"revoked": len(self._revoked), "refreshes": self.refreshes}
@@ -0,0 +1,200 @@
+from bisect import bisect_left, insort
+from typing import Dict, List, Tuple
+import asyncio
+import heapq
+import logging
+import random
+import sys
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Ranges larger than this are answered from a per-prefix top-K instead of being scanned
+SCAN_LIMIT = 500
+TOP_K = 50
+# /songs/suggest returns at most this many; a top-K list shorter than that is re-ranked
+TOP_K_MIN = 20
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and collapse whitespace"""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.lower().split())
+
+
+def _terms(label: str) -> List[str]:
+    """Index the whole name and every word-start suffix ("blinding lights", "lights")"""
+    words = normalize(label).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+def _rank_prefixes(entries: List[Tuple[str, str]], docs: Dict[str, dict], prefix: str, lo: int, hi: int,
+                   top: Dict[str, List[str]]):
+    """Rank entries[lo:hi] (all starting with prefix) and every sub-prefix matching more than SCAN_LIMIT entries"""
+    i = bisect_left(entries, (prefix + "\x00",), lo, hi)  # terms equal to the prefix sort first
+    candidates = {key for _, key in entries[lo:i]}
+    while i < hi:
+        child = entries[i][0][:len(prefix) + 1]
+        end = bisect_left(entries, (child + "\uffff",), i, hi)
+        if end - i > SCAN_LIMIT:
+            # A large child's top-K already holds every key of its range that can make this prefix's top-K
+            _rank_prefixes(entries, docs, child, i, end, top)
+            candidates.update(top[child])
+        else:
+            candidates.update(key for _, key in entries[i:end])
+        i = end
+    top[prefix] = heapq.nlargest(TOP_K, candidates, key=lambda key: docs[key]["score"])
+
+
+class PrefixIndex:
+    """Sorted-array prefix index over names, ranked by popularity"""
+
+    def __init__(self):
+        self._entries: List[Tuple[str, str]] = []  # sorted (term, doc_key)
+        self._docs: Dict[str, dict] = {}
+        self._top: Dict[str, List[str]] = {}  # prefix -> doc_keys ranked by score
+
+    def build(self, docs: List[dict]):
+        """Replace the index contents; docs have type, id, label, score and optional subtitle"""
+        new_docs = {}
+        entries = []
+        for doc in docs:
+            key = f"{doc['type']}:{doc['id']}"
+            new_docs[key] = doc
+            entries.extend((term, key) for term in _terms(doc["label"]))
+        entries.sort()
+
+        # Every prefix too large to scan per query is pre-ranked here, so no query ranks a large range
+        top: Dict[str, List[str]] = {}
+        _rank_prefixes(entries, new_docs, "", 0, len(entries), top)
+        top.pop("")
+
+        self._entries, self._docs, self._top = entries, new_docs, top
+
+    def has(self, doc_type: str, doc_id: str) -> bool:
+        """Whether a document is in the index"""
+        return f"{doc_type}:{doc_id}" in self._docs
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        lo = bisect_left(self._entries, (prefix,))
+        hi = bisect_left(self._entries, (prefix + "\uffff",), lo)
+        return lo, hi
+
+    def _rank(self, lo: int, hi: int, limit: int) -> List[str]:
+        keys = {key for _, key in self._entries[lo:hi]}
+        return heapq.nlargest(limit, keys, key=lambda key: self._docs[key]["score"])
+
+    def suggest(self, query: str, limit: int = 10) -> List[dict]:
+        """Most popular names with a word starting with query"""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+
+        lo, hi = self._range(prefix)
+        if hi - lo <= SCAN_LIMIT:
+            keys = self._rank(lo, hi, limit)
+        else:
+            keys = self._top.get(prefix)
+            if keys is None:
+                # Only for a prefix that grew past SCAN_LIMIT through upserts since the last build
+                keys = self._top[prefix] = self._rank(lo, hi, TOP_K)
+            keys = keys[:limit]
+        return [self._docs[key] for key in keys]
+
+    def upsert(self, doc: dict):
+        """Add or replace one document (e.g. after a playlist is created or renamed)"""
+        key = f"{doc['type']}:{doc['id']}"
+        self.remove(doc["type"], doc["id"])
+        self._docs[key] = doc
+        for term in _terms(doc["label"]):
+            insort(self._entries, (term, key))
+            # Keep pre-ranked prefixes of this term current
+            for depth in range(1, len(term) + 1):
+                top = self._top.get(term[:depth])
+                if top is not None and key not in top:
+                    top.append(key)
+                    top.sort(key=lambda k: self._docs[k]["score"], reverse=True)
+                    del top[TOP_K:]
+
+    def remove(self, doc_type: str, doc_id: str):
+        """Drop one document from the index"""
+        key = f"{doc_type}:{doc_id}"
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        for term in _terms(doc["label"]):
+            i = bisect_left(self._entries, (term, key))
+            if i < len(self._entries) and self._entries[i] == (term, key):
+                del self._entries[i]
+            for depth in range(1, len(term) + 1):
+                top = self._top.get(term[:depth])
+                if top is not None and key in top:
+                    # The rest of the list is still the exact ranking for this prefix
+                    top.remove(key)
+                    if len(top) < TOP_K_MIN:
+                        # Too short to fill a response after many removals; re-rank on the next query
+                        del self._top[term[:depth]]
+
+    def stats(self) -> dict:
+        """Entry counts and an estimate of the memory held by the sorted entries"""
+        sample = random.sample(self._entries, min(len(self._entries), 1000))
+        per_entry = (
+            sum(sys.getsizeof(entry) + sys.getsizeof(entry[0]) for entry in sample) / len(sample)
+            if sample else 0
+        )
+        return {
+            "docs": len(self._docs),
+            "entries": len(self._entries),
+            "cached_prefixes": len(self._top),
+            "approx_bytes": int(sys.getsizeof(self._entries) + per_entry * len(self._entries))
+        }
+
+
+def song_doc(song: dict) -> dict:
+    return {
+        "type": "song",
+        "id": song["song_id"],
+        "label": song["title"],
+        "subtitle": song.get("artist", ""),
+        "score": song.get("plays", 0)
+    }
+
+
+def artist_doc(artist: dict) -> dict:
+    return {
+        "type": "artist",
+        "id": artist["artist_id"],
+        "label": artist["name"],
+        "score": artist.get("followers", 0)
+    }
+
+
+def playlist_doc(playlist: dict) -> dict:
+    return {
+        "type": "playlist",
+        "id": playlist["playlist_id"],
+        "label": playlist["name"],
+        "score": playlist.get("followers", 0)
+    }
+
+
+suggest_index = PrefixIndex()
+
+
+async def build_suggest_index(db):
+    """Load song titles, artist names and public playlist names from MongoDB"""
+    docs = []
+    async for song in db.songs.find({}, {"_id": 0, "song_id": 1, "title": 1, "artist": 1, "plays": 1}):
+        docs.append(song_doc(song))
+    async for artist in db.artists.find({}, {"_id": 0, "artist_id": 1, "name": 1, "followers": 1}):
+        docs.append(artist_doc(artist))
+    async for playlist in db.playlists.find(
+        {"is_public": True}, {"_id": 0, "playlist_id": 1, "name": 1, "followers": 1}
+    ):
+        docs.append(playlist_doc(playlist))
+
+    # Sorting a large catalog is CPU-bound; keep the event loop responsive meanwhile
+    await asyncio.to_thread(suggest_index.build, docs)
+    logger.info(f"Suggest index built with {len(docs)} names")
@@ -1,12 +1,17 @@
-from googleapiclient.discovery import build
-from typing import List, Optional
+from typing import Dict, List, Optional
+from datetime import datetime, timezone, timedelta, time
+from zoneinfo import ZoneInfo
 import os
+import asyncio
 import logging
+import httpx
+from pymongo import ReplaceOne
 from models import YouTubeVideo
+from cache import TTLCache, SingleFlight
 
 logger = logging.getLogger(__name__)
 
-# YouTube API keys from environment variables (rotating keys for rate limiting)
+# YouTube API keys from environment variables (pooled so their daily quotas add up)
 YOUTUBE_API_KEYS = [
     os.environ.get('YOUTUBE_API_KEY_1', ''),
     os.environ.get('YOUTUBE_API_KEY_2', ''),
@@ -18,26 +23,395 @@ YOUTUBE_API_KEYS = [key for key in YOUTUBE_API_KEYS if key]
 if not YOUTUBE_API_KEYS:
     logger.warning("No YouTube API keys configured. YouTube integration will not work.")
 
-current_key_index = 0
+# YouTube Data API endpoint (overridable so a local stub server can stand in for Google)
+YOUTUBE_API_BASE_URL = os.environ.get('YOUTUBE_API_BASE_URL', 'https://www.googleapis.com/youtube/v3')
+YOUTUBE_HTTP_TIMEOUT = float(os.environ.get('YOUTUBE_HTTP_TIMEOUT', '10'))
+YOUTUBE_MAX_CONNECTIONS = int(os.environ.get('YOUTUBE_MAX_CONNECTIONS', '20'))
 
-def get_youtube_client():
-    """Get YouTube API client with rotating keys"""
-    global current_key_index
-    api_key = YOUTUBE_API_KEYS[current_key_index % len(YOUTUBE_API_KEYS)]
-    return build('youtube', 'v3', developerKey=api_key)
+# Response cache: per-endpoint TTLs (seconds) with a bounded LRU footprint
+YOUTUBE_CACHE_MAXSIZE = int(os.environ.get('YOUTUBE_CACHE_MAXSIZE', '2048'))
+YOUTUBE_CACHE_TTLS = {
+    'search': int(os.environ.get('YOUTUBE_SEARCH_CACHE_TTL', '3600')),
+    'video': int(os.environ.get('YOUTUBE_VIDEO_CACHE_TTL', '21600')),
+    'related': int(os.environ.get('YOUTUBE_RELATED_CACHE_TTL', '3600'))
+}
+# How long a failed upstream call is replayed to callers instead of being retried
+YOUTUBE_ERROR_TTL = int(os.environ.get('YOUTUBE_ERROR_TTL', '5'))
 
-def rotate_api_key():
-    """Rotate to next API key"""
-    global current_key_index
-    current_key_index += 1
-    logger.info(f"Rotated to API key index {current_key_index % len(YOUTUBE_API_KEYS)}")
+# Daily quota per key in units; YouTube resets quotas at midnight Pacific Time
+YOUTUBE_DAILY_QUOTA = int(os.environ.get('YOUTUBE_DAILY_QUOTA', '10000'))
+QUOTA_COSTS = {'search': 100, 'videos': 1}
+QUOTA_RESET_TZ = ZoneInfo('America/Los_Angeles')
+QUOTA_EXCEEDED_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+
+# videos.list accepts at most 50 comma-separated IDs per call
+VIDEOS_BATCH_SIZE = 50
+
+# Shared keep-alive connection pool, created lazily on first use
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+class YouTubeAPIError(Exception):
+    """Error response returned by the YouTube Data API"""
+
+    def __init__(self, status_code: int, reason: str, message: str):
+        super().__init__(f"{status_code} {reason}: {message}")
+        self.status_code = status_code
+        self.reason = reason
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the pooled HTTP client used for all YouTube API calls"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            base_url=YOUTUBE_API_BASE_URL,
+            timeout=YOUTUBE_HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=YOUTUBE_MAX_CONNECTIONS,
+                max_keepalive_connections=YOUTUBE_MAX_CONNECTIONS,
+                keepalive_expiry=60
+            )
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the pooled HTTP client (called on app shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class YouTubeClient:
+    """Long-lived YouTube Data API client bound to a single API key"""
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    async def get(self, resource: str, **params) -> dict:
+        """Call a YouTube Data API list endpoint without blocking the event loop"""
+        response = await get_http_client().get(f"/{resource}", params={**params, "key": self.api_key})
+
+        if response.status_code != 200:
+            reason, message = "unknown", response.text
+            try:
+                error = response.json().get("error", {})
+                message = error.get("message", message)
+                reason = (error.get("errors") or [{}])[0].get("reason", reason)
+            except ValueError:
+                pass
+            raise YouTubeAPIError(response.status_code, reason, message)
+
+        return response.json()
+
+
+# One client per API key, built once at import and reused for every call
+_clients = {key: YouTubeClient(key) for key in YOUTUBE_API_KEYS}
+
+
+def get_youtube_client(api_key: str) -> YouTubeClient:
+    """Get the cached YouTube API client for a key"""
+    client = _clients.get(api_key)
+    if client is None:
+        client = _clients[api_key] = YouTubeClient(api_key)
+    return client
+
+
+class APIKeyPool:
+    """Tracks quota spent per API key and hands out the key with the most budget left"""
+
+    def __init__(self, keys: List[str], daily_quota: int):
+        self.daily_quota = daily_quota
+        self._spent: Dict[str, int] = {key: 0 for key in keys}
+        self._parked_until: Dict[str, datetime] = {}
+        self._quota_day = self._today()
+
+    @staticmethod
+    def _today():
+        return datetime.now(QUOTA_RESET_TZ).date()
+
+    def _next_reset(self) -> datetime:
+        midnight = datetime.combine(self._today() + timedelta(days=1), time(), tzinfo=QUOTA_RESET_TZ)
+        return midnight.astimezone(timezone.utc)
+
+    def _roll_over(self):
+        """Start a fresh budget for every key once the daily quota resets"""
+        today = self._today()
+        if today != self._quota_day:
+            self._quota_day = today
+            self._spent = {key: 0 for key in self._spent}
+            self._parked_until.clear()
+
+    def acquire(self, cost: int) -> str:
+        """Reserve cost units on the healthy key with the most remaining budget"""
+        self._roll_over()
+        now = datetime.now(timezone.utc)
+        candidates = [
+            key for key, spent in self._spent.items()
+            if spent + cost <= self.daily_quota and self._parked_until.get(key, now) <= now
+        ]
+        if not candidates:
+            raise YouTubeAPIError(429, "quotaExceeded", "All YouTube API keys are out of quota")
+
+        api_key = min(candidates, key=lambda key: self._spent[key])
+        self._spent[api_key] += cost
+        return api_key
+
+    def park(self, api_key: str):
+        """Take a key that hit quotaExceeded out of rotation until the daily reset"""
+        self._spent[api_key] = self.daily_quota
+        self._parked_until[api_key] = self._next_reset()
+        logger.warning(f"YouTube API key ...{api_key[-4:]} out of quota until {self._parked_until[api_key].isoformat()}")
+
+    def stats(self) -> List[dict]:
+        """Spent and remaining budget per key (keys are masked)"""
+        self._roll_over()
+        now = datetime.now(timezone.utc)
+        return [
+            {
+                "key": f"...{key[-4:]}",
+                "spent": spent,
+                "remaining": max(self.daily_quota - spent, 0),
+                "parked_until": self._parked_until[key] if self._parked_until.get(key, now) > now else None
+            }
+            for key, spent in self._spent.items()
+        ]
+
+
+key_pool = APIKeyPool(YOUTUBE_API_KEYS, YOUTUBE_DAILY_QUOTA)
+
+
+async def youtube_api_get(resource: str, **params) -> dict:
+    """Call the YouTube Data API, moving to another key when one runs out of quota"""
+    if not YOUTUBE_API_KEYS:
+        raise YouTubeAPIError(503, "noApiKey", "No YouTube API keys configured")
+
+    for _ in range(len(YOUTUBE_API_KEYS)):
+        api_key = key_pool.acquire(QUOTA_COSTS.get(resource, 1))
+        try:
+            return await get_youtube_client(api_key).get(resource, **params)
+        except YouTubeAPIError as e:
+            if e.reason not in QUOTA_EXCEEDED_REASONS:
+                raise
+            key_pool.park(api_key)
+
+    raise YouTubeAPIError(429, "quotaExceeded", "All YouTube API keys are out of quota")
+
+
+def get_quota_stats() -> List[dict]:
+    """Remaining daily quota per YouTube API key"""
+    return key_pool.stats()
+
+
+# ==================== RESPONSE CACHE ====================
+
+_MISSING = object()
+
+_caches = {name: TTLCache(YOUTUBE_CACHE_MAXSIZE, ttl) for name, ttl in YOUTUBE_CACHE_TTLS.items()}
+_store_hits = {name: 0 for name in YOUTUBE_CACHE_TTLS}
+
+# Concurrent identical lookups share one upstream call; failures are remembered briefly
+_inflight = SingleFlight()
+_recent_errors = TTLCache(YOUTUBE_CACHE_MAXSIZE, YOUTUBE_ERROR_TTL)
+
+# Optional MongoDB second tier, shared across workers and restarts
+_cache_collection = None
+
+
+def configure_cache_store(collection):
+    """Use a MongoDB collection as the second cache tier"""
+    global _cache_collection
+    _cache_collection = collection
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+async def _cache_get(name: str, key: str):
+    """Look a cached response up in memory, then in the MongoDB tier"""
+    value = _caches[name].get(key, _MISSING)
+    if value is not _MISSING or _cache_collection is None:
+        return value
 
-async def search_youtube_music(query: str, max_results: int = 10) -> List[YouTubeVideo]:
-    """Search YouTube for music videos"""
     try:
-        youtube = get_youtube_client()
-        
-        request = youtube.search().list(
+        doc = await _cache_collection.find_one({
+            "_id": f"{name}:{key}",
+            "expires_at": {"$gt": datetime.now(timezone.utc)}
+        })
+    except Exception as e:
+        logger.warning(f"YouTube cache store read failed: {str(e)}")
+        return _MISSING
+
+    if not doc:
+        return _MISSING
+
+    _store_hits[name] += 1
+    remaining = (doc["expires_at"].replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)).total_seconds()
+    _caches[name].set(key, doc["value"], ttl=max(remaining, 0))
+    return doc["value"]
+
+
+async def _cache_set(name: str, key: str, value):
+    """Store a response in memory and in the MongoDB tier"""
+    _caches[name].set(key, value)
+    if _cache_collection is None:
+        return
+
+    try:
+        await _cache_collection.replace_one(
+            {"_id": f"{name}:{key}"},
+            {
+                "value": value,
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=YOUTUBE_CACHE_TTLS[name])
+            },
+            upsert=True
+        )
+    except Exception as e:
+        logger.warning(f"YouTube cache store write failed: {str(e)}")
+
+
+async def _cache_get_many(name: str, keys: List[str]) -> Dict[str, dict]:
+    """Look several keys up in memory, then fetch the rest from the MongoDB tier in one query"""
+    found = {}
+    for key in keys:
+        value = _caches[name].get(key, _MISSING)
+        if value is not _MISSING:
+            found[key] = value
+
+    missing = [key for key in keys if key not in found]
+    if not missing or _cache_collection is None:
+        return found
+
+    try:
+        docs = await _cache_collection.find({
+            "_id": {"$in": [f"{name}:{key}" for key in missing]},
+            "expires_at": {"$gt": datetime.now(timezone.utc)}
+        }).to_list(len(missing))
+    except Exception as e:
+        logger.warning(f"YouTube cache store read failed: {str(e)}")
+        return found
+
+    now = datetime.now(timezone.utc)
+    for doc in docs:
+        key = doc["_id"].split(":", 1)[1]
+        remaining = (doc["expires_at"].replace(tzinfo=timezone.utc) - now).total_seconds()
+        _caches[name].set(key, doc["value"], ttl=max(remaining, 0))
+        _store_hits[name] += 1
+        found[key] = doc["value"]
+    return found
+
+
+async def _cache_set_many(name: str, values: Dict[str, dict]):
+    """Store several responses in memory and in the MongoDB tier in one bulk write"""
+    for key, value in values.items():
+        _caches[name].set(key, value)
+    if not values or _cache_collection is None:
+        return
+
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=YOUTUBE_CACHE_TTLS[name])
+    try:
+        await _cache_collection.bulk_write([
+            ReplaceOne({"_id": f"{name}:{key}"}, {"value": value, "expires_at": expires_at}, upsert=True)
+            for key, value in values.items()
+        ], ordered=False)
+    except Exception as e:
+        logger.warning(f"YouTube cache store write failed: {str(e)}")
+
+
+def get_cache_stats() -> dict:
+    """Hit/miss counters for each YouTube response cache and the single-flight layer"""
+    stats = {
+        name: {**cache.stats(), "store_hits": _store_hits[name]}
+        for name, cache in _caches.items()
+    }
+    stats["single_flight"] = _inflight.stats()
+    return stats
+
+
+async def _cached_call(name: str, key: str, fetch):
+    """Serve a cached response or coalesce concurrent misses into one upstream call"""
+    cached = await _cache_get(name, key)
+    if cached is not _MISSING:
+        return cached
+
+    # A call that just failed is not retried by every waiting client at once
+    error = _recent_errors.get((name, key))
+    if error is not None:
+        raise error
+
+    async def load():
+        try:
+            value = await fetch()
+        except Exception as e:
+            _recent_errors.set((name, key), e)
+            raise
+        if value is not None:
+            await _cache_set(name, key, value)
+        return value
+
+    return await _inflight.do((name, key), load)
+
+
+def _video_from_item(item: dict) -> dict:
+    """Convert a videos.list item into a cacheable YouTubeVideo dict"""
+    # Plain dict with the model's fields: callers validate once when they build YouTubeVideo(**video)
+    return {
+        'video_id': item['id'],
+        'title': item['snippet']['title'],
+        'channel_title': item['snippet']['channelTitle'],
+        'thumbnail_url': item['snippet']['thumbnails']['high']['url'],
+        'duration': item['contentDetails']['duration'],
+        'view_count': int(item['statistics'].get('viewCount', 0)),
+        'published_at': item['snippet']['publishedAt']
+    }
+
+
+async def _fetch_videos(video_ids: List[str]) -> Dict[str, dict]:
+    """Fetch details for up to VIDEOS_BATCH_SIZE videos with one videos.list call"""
+    response = await youtube_api_get(
+        'videos',
+        part='snippet,contentDetails,statistics',
+        id=','.join(video_ids)
+    )
+    return {item['id']: _video_from_item(item) for item in response.get('items', [])}
+
+
+async def _load_videos(video_ids: List[str]) -> Dict[str, dict]:
+    videos = await _fetch_videos(video_ids)
+    await _cache_set_many('video', videos)
+    return videos
+
+
+async def _get_videos(video_ids: List[str]) -> Dict[str, dict]:
+    """Resolve video details from the cache, batching misses into chunked videos.list calls"""
+    unique_ids = list(dict.fromkeys(video_ids))
+    videos = await _cache_get_many('video', unique_ids)
+
+    missing = [video_id for video_id in unique_ids if video_id not in videos]
+    chunks = [tuple(missing[i:i + VIDEOS_BATCH_SIZE]) for i in range(0, len(missing), VIDEOS_BATCH_SIZE)]
+    results = await asyncio.gather(*[
+        _inflight.do(('videos', chunk), lambda chunk=chunk: _load_videos(list(chunk)))
+        for chunk in chunks
+    ])
+    for fetched in results:
+        videos.update(fetched)
+    return videos
+
+
+async def _enrich_search_results(response: dict) -> List[dict]:
+    """Turn search.list results into fully populated videos (duration, views) in result order"""
+    video_ids = [item['id']['videoId'] for item in response.get('items', [])]
+    videos = await _get_videos(video_ids)
+    return [videos[video_id] for video_id in video_ids if video_id in videos]
+
+
+async def _fetch_search(query: str, max_results: int) -> List[dict]:
+    try:
+        response = await youtube_api_get(
+            'search',
             part='snippet',
             q=f"{query} official music video",
             type='video',
@@ -45,95 +419,57 @@ async def search_youtube_music(query: str, max_results: int = 10) -> List[YouTub
             maxResults=max_results,
             order='relevance'
         )
-        
-        response = request.execute()
-        
-        videos = []
-        video_ids = [item['id']['videoId'] for item in response.get('items', [])]
-        
-        if video_ids:
-            # Get video details including duration
-            video_details = youtube.videos().list(
-                part='snippet,contentDetails,statistics',
-                id=','.join(video_ids)
-            ).execute()
-            
-            for item in video_details.get('items', []):
-                videos.append(YouTubeVideo(
-                    video_id=item['id'],
-                    title=item['snippet']['title'],
-                    channel_title=item['snippet']['channelTitle'],
-                    thumbnail_url=item['snippet']['thumbnails']['high']['url'],
-                    duration=item['contentDetails']['duration'],
-                    view_count=int(item['statistics'].get('viewCount', 0)),
-                    published_at=item['snippet']['publishedAt']
-                ))
-        
-        return videos
-    
+        return await _enrich_search_results(response)
+
     except Exception as e:
         logger.error(f"YouTube API error: {str(e)}")
-        rotate_api_key()
         raise
 
+
+async def _fetch_video_details(video_id: str) -> Optional[dict]:
+    videos = await _fetch_videos([video_id])
+    return videos.get(video_id)
+
+
+async def _fetch_related(video_id: str, max_results: int) -> List[dict]:
+    response = await youtube_api_get(
+        'search',
+        part='snippet',
+        relatedToVideoId=video_id,
+        type='video',
+        maxResults=max_results
+    )
+    return await _enrich_search_results(response)
+
+
+async def search_youtube_music(query: str, max_results: int = 10) -> List[YouTubeVideo]:
+    """Search YouTube for music videos"""
+    cache_key = f"{_normalize_query(query)}|{max_results}"
+    videos = await _cached_call('search', cache_key, lambda: _fetch_search(query, max_results))
+    return [YouTubeVideo(**video) for video in videos]
+
 async def get_youtube_video_details(video_id: str) -> Optional[YouTubeVideo]:
     """Get details for a specific YouTube video"""
     try:
-        youtube = get_youtube_client()
-        
-        request = youtube.videos().list(
-            part='snippet,contentDetails,statistics',
-            id=video_id
-        )
-        
-        response = request.execute()
-        items = response.get('items', [])
-        
-        if not items:
-            return None
-        
-        item = items[0]
-        return YouTubeVideo(
-            video_id=item['id'],
-            title=item['snippet']['title'],
-            channel_title=item['snippet']['channelTitle'],
-            thumbnail_url=item['snippet']['thumbnails']['high']['url'],
-            duration=item['contentDetails']['duration'],
-            view_count=int(item['statistics'].get('viewCount', 0)),
-            published_at=item['snippet']['publishedAt']
-        )
-    
+        video = await _cached_call('video', video_id, lambda: _fetch_video_details(video_id))
+        return YouTubeVideo(**video) if video else None
+
     except Exception as e:
         logger.error(f"YouTube API error: {str(e)}")
         return None
 
+async def get_youtube_videos_bulk(video_ids: List[str]) -> List[YouTubeVideo]:
+    """Get details for many YouTube videos, in input order, batching cache misses"""
+    videos = await _get_videos(video_ids)
+    return [YouTubeVideo(**videos[video_id]) for video_id in video_ids if video_id in videos]
+
 async def get_related_videos(video_id: str, max_results: int = 5) -> List[YouTubeVideo]:
     """Get related videos for recommendations"""
     try:
-        youtube = get_youtube_client()
-        
-        request = youtube.search().list(
-            part='snippet',
-            relatedToVideoId=video_id,
-            type='video',
-            maxResults=max_results
-        )
-        
-        response = request.execute()
-        
-        videos = []
-        for item in response.get('items', []):
-            videos.append(YouTubeVideo(
-                video_id=item['id']['videoId'],
-                title=item['snippet']['title'],
-                channel_title=item['snippet']['channelTitle'],
-                thumbnail_url=item['snippet']['thumbnails']['high']['url'],
-                duration="",  # Not available in search results
-                published_at=item['snippet']['publishedAt']
-            ))
-        
-        return videos
-    
+        cache_key = f"{video_id}|{max_results}"
+        videos = await _cached_call('related', cache_key, lambda: _fetch_related(video_id, max_results))
+        return [YouTubeVideo(**video) for video in videos]
+
     except Exception as e:
         logger.error(f"YouTube API error: {str(e)}")
-        return []
\ No newline at end of file
+        return []
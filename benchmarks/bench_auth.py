@@ -0,0 +1,48 @@
+"""Requests/s of /api/auth/me with the session and user caches cold vs warm (user-008); needs mongod at MONGO_URL"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from common import asgi_client, db_round_trips, drop_scratch_database, measure_async, report, scratch_database
+
+import auth
+
+CONCURRENCY = 16
+HEADERS = {"Authorization": "Bearer bench-session"}
+
+
+async def main():
+    db = await scratch_database()
+    now = datetime.now(timezone.utc)
+    await db.users.insert_one({
+        "user_id": "bench-user", "email": "bench@example.com", "name": "Bench", "created_at": now,
+        "preferences": {"region": "global", "favorite_genres": []}, "recently_played": []
+    })
+    await db.user_sessions.insert_one({
+        "user_id": "bench-user", "session_token": "bench-session", "expires_at": now + timedelta(days=1), "created_at": now
+    })
+
+    async with asgi_client() as client:
+        async def me(clear_caches: bool):
+            if clear_caches:
+                auth._session_cache.clear()
+                auth._user_cache.clear()
+            response = await client.get("/api/auth/me", headers=HEADERS)
+            assert response.status_code == 200, response.text
+
+        for label, cold in (("cold: caches cleared per request ($lookup)", True), ("warm: session + user cache hits", False)):
+            await me(cold)
+            trips_before, calls = db_round_trips(), 0
+
+            async def call():
+                nonlocal calls
+                await me(cold)
+                calls += 1
+
+            report(label, await measure_async(call, concurrency=CONCURRENCY))
+            print(f"{'':<48} {(db_round_trips() - trips_before) / calls:.2f} MongoDB round trips per request")
+
+    await drop_scratch_database(db)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+"""/api/songs page 1 vs page 10,000 (BENCH_DEEP_PAGE): skip/limit vs keyset cursors (user-012); needs mongod at MONGO_URL"""
+import asyncio
+import os
+import random
+
+from common import asgi_client, drop_scratch_database, measure_async, report, scratch_database
+
+from pagination import encode_cursor, sort_spec
+
+PAGE_SIZE = 20
+DEEP_PAGE = int(os.environ.get("BENCH_DEEP_PAGE", "10000"))
+CATALOG_SIZE = (DEEP_PAGE + 10) * PAGE_SIZE
+INSERT_BATCH = 10000
+
+
+async def main():
+    rng = random.Random(42)
+    db = await scratch_database()
+    print(f"Seeding {CATALOG_SIZE:,} songs...")
+    for start in range(0, CATALOG_SIZE, INSERT_BATCH):
+        await db.songs.insert_many([
+            {"song_id": f"song-{i}", "title": f"Song {i}", "artist": "Artist", "album": "Album", "youtube_id": "x",
+             "genre": "Pop", "region": "Global", "release_year": 2024, "plays": rng.randint(0, 10**6)}
+            for i in range(start, min(start + INSERT_BATCH, CATALOG_SIZE))
+        ])
+
+    # The cursor a client would hold after paging to DEEP_PAGE (one skip here, instead of 10,000 requests)
+    offset = (DEEP_PAGE - 1) * PAGE_SIZE
+    last = await db.songs.find({}, {"plays": 1}).sort(sort_spec("plays")).skip(offset - 1).limit(1).to_list(1)
+    deep_cursor = encode_cursor(last[0]["plays"], last[0]["_id"])
+
+    cases = {
+        "skip/limit, page 1": {"skip": 0},
+        f"skip/limit, page {DEEP_PAGE:,}": {"skip": offset},
+        "cursor, page 1": {"cursor": ""},
+        f"cursor, page {DEEP_PAGE:,}": {"cursor": deep_cursor},
+    }
+    async with asgi_client() as client:
+        # Both deep variants must return the same page
+        skip_page = (await client.get("/api/songs", params={"skip": offset, "limit": PAGE_SIZE})).json()
+        cursor_page = (await client.get("/api/songs", params={"cursor": deep_cursor, "limit": PAGE_SIZE})).json()["items"]
+        assert [song["song_id"] for song in skip_page] == [song["song_id"] for song in cursor_page]
+
+        for label, params in cases.items():
+            async def page():
+                response = await client.get("/api/songs", params={**params, "limit": PAGE_SIZE})
+                assert response.status_code == 200, response.text
+
+            report(label, await measure_async(page, seconds=3))
+
+    await drop_scratch_database(db)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+"""get_playlist on a 5,000-track playlist: find_one + $in vs the paged $lookup aggregation (user-018)
+
+Needs mongod at MONGO_URL.
+"""
+import asyncio
+import random
+from datetime import datetime, timezone
+
+import orjson
+from common import asgi_client, drop_scratch_database, measure_async, report, scratch_database
+
+TRACKS = 5000
+PAGE_SIZE = 100
+
+
+async def seed(db, rng: random.Random) -> list:
+    await db.songs.insert_many([
+        {"song_id": f"song-{i}", "title": f"Song {i}", "artist": "Artist", "album": "Album", "youtube_id": "x",
+         "genre": "Pop", "region": "Global", "release_year": 2024, "plays": rng.randint(0, 10**6),
+         "lyrics": [{"time": t * 5, "text": f"line {t} of song {i}"} for t in range(40)]}
+        for i in range(TRACKS)
+    ])
+    song_ids = [f"song-{i}" for i in range(TRACKS)]
+    rng.shuffle(song_ids)
+    now = datetime.now(timezone.utc)
+    await db.playlists.insert_one({
+        "playlist_id": "bench-playlist", "name": "Bench", "description": "", "cover_url": "https://img",
+        "songs": song_ids, "owner": "bench-user", "followers": 0, "region": "global", "is_public": True,
+        "created_at": now, "updated_at": now
+    })
+    return song_ids
+
+
+async def find_then_in(db) -> dict:
+    """The previous implementation: every full song document (lyrics included), in arbitrary order"""
+    playlist = await db.playlists.find_one({"playlist_id": "bench-playlist"}, {"_id": 0})
+    song_ids = playlist.get("songs", [])
+    songs = await db.songs.find({"song_id": {"$in": song_ids}}, {"_id": 0}).to_list(len(song_ids))
+    return {**playlist, "song_details": songs}
+
+
+async def main():
+    db = await scratch_database()
+    song_ids = await seed(db, random.Random(42))
+    print(f"before: {len(orjson.dumps(await find_then_in(db))):,} bytes per response, songs unordered")
+
+    async with asgi_client() as client:
+        async def first_page():
+            response = await client.get("/api/playlists/bench-playlist", params={"song_limit": PAGE_SIZE})
+            assert response.status_code == 200, response.text
+            return response
+
+        page = (await first_page()).json()
+        assert [song["song_id"] for song in page["song_details"]] == song_ids[:PAGE_SIZE]
+        print(f"after: {len((await first_page()).content):,} bytes per {PAGE_SIZE}-song page, in playlist order")
+
+        async def all_pages():
+            for offset in range(0, TRACKS, 500):
+                response = await client.get(
+                    "/api/playlists/bench-playlist", params={"song_offset": offset, "song_limit": 500}
+                )
+                assert response.status_code == 200, response.text
+
+        report("before: find_one + $in, all 5,000 full songs", await measure_async(lambda: find_then_in(db), seconds=5))
+        report(f"after: aggregation, first {PAGE_SIZE}-song page", await measure_async(first_page, seconds=5))
+        report("after: all 5,000 songs in 500-song pages", await measure_async(all_pages, seconds=5))
+
+    await drop_scratch_database(db)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""Payload size and serialization time for 100 songs: full List[Song] responses vs cards and ?fields= (user-019)
+
+The first part needs no database: routes return the same 100 stored songs, shaped as each response was.
+The second part times /api/songs?limit=100 itself and runs only when a mongod answers at MONGO_URL.
+"""
+import asyncio
+import os
+from typing import List
+
+from common import asgi_client, drop_scratch_database, measure, measure_async, report, scratch_database
+
+import httpx
+import orjson
+from database import close_database
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from models import Song
+from projection import SONG_CARD_FIELDS
+from pydantic import TypeAdapter
+from pymongo.errors import ServerSelectionTimeoutError
+
+os.environ.setdefault("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")
+
+FIELDS = "title,artist,cover_url,youtube_id"
+SONGS = [
+    {"song_id": f"song-{i}", "title": f"Song {i}", "artist": "Artist", "album": "Album", "duration": "3:35",
+     "duration_seconds": 215, "cover_url": "https://images.example.com/cover.jpg", "youtube_id": "dQw4w9WgXcQ",
+     "genre": "Pop", "region": "Global", "plays": 1000000 - i, "release_year": 2024, "source": "youtube",
+     "lyrics": [{"time": t * 5, "text": f"line {t} of song {i}, as long as a sung line usually is"} for t in range(40)]}
+    for i in range(100)
+]
+CARDS = [{field: song[field] for field in SONG_CARD_FIELDS} for song in SONGS]
+SELECTED = [{field: song[field] for field in ("song_id", *FIELDS.split(","))} for song in SONGS]
+
+
+def projection_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/full", response_model=List[Song])
+    async def full():
+        return SONGS  # every stored field, validated against Song, then jsonable_encoder + json.dumps
+
+    @app.get("/cards")
+    async def cards():
+        return ORJSONResponse(CARDS)
+
+    @app.get("/fields")
+    async def fields():
+        return ORJSONResponse(SELECTED)
+
+    return app
+
+
+async def without_database():
+    songs = TypeAdapter(List[Song])
+    report("encode: List[Song] validate + dump", measure(lambda: songs.dump_json(songs.validate_python(SONGS))))
+    report("encode: cards, orjson", measure(lambda: orjson.dumps(CARDS)))
+    report("encode: ?fields= subset, orjson", measure(lambda: orjson.dumps(SELECTED)))
+
+    transport = httpx.ASGITransport(app=projection_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/full", "/cards", "/fields"):
+            size = len((await client.get(path)).content)
+            report(f"route {path}: 100 songs, {size:,} bytes", await measure_async(lambda: client.get(path), seconds=3))
+
+
+async def with_database():
+    try:
+        db = await scratch_database()
+    except ServerSelectionTimeoutError:
+        close_database()
+        print("/api/songs?limit=100: skipped, no mongod at MONGO_URL")
+        return
+    await db.songs.insert_many([{**song, "song_id": f"{song['song_id']}-{copy}"} for copy in range(10) for song in SONGS])
+
+    async with asgi_client() as client:
+        for params in ({"limit": 100}, {"limit": 100, "fields": FIELDS}):
+            async def songs():
+                response = await client.get("/api/songs", params=params)
+                assert response.status_code == 200, response.text
+                return response
+
+            size = len((await songs()).content)
+            label = "/api/songs?limit=100" + (f"&fields={FIELDS}" if "fields" in params else "")
+            report(f"{label}, {size:,} bytes", await measure_async(songs, seconds=5))
+
+    await drop_scratch_database(db)
+
+
+async def main():
+    await without_database()
+    await with_database()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
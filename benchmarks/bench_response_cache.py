@@ -0,0 +1,81 @@
+"""Catalog read load test with and without the response cache: requests/s and MongoDB queries per request (user-017)
+
+Needs mongod at MONGO_URL.
+"""
+import asyncio
+import random
+
+from common import asgi_client, db_round_trips, drop_scratch_database, measure_async, report, scratch_database
+
+from cache import TTLCache
+from response_cache import response_cache
+
+SONGS = 5000
+ARTISTS = 500
+CONCURRENCY = 32
+
+
+async def seed(db, rng: random.Random):
+    await db.songs.insert_many([
+        {"song_id": f"song-{i}", "title": f"Song {i}", "artist": f"Artist {i % ARTISTS}", "album": "Album",
+         "youtube_id": "x", "genre": "Pop", "region": "Global", "release_year": 2024, "plays": rng.randint(0, 10**6),
+         "lyrics": [{"time": t * 5, "text": f"line {t}"} for t in range(40)]}
+        for i in range(SONGS)
+    ])
+    await db.artists.insert_many([
+        {"artist_id": f"artist-{i}", "name": f"Artist {i}", "image_url": "https://img", "followers": 0,
+         "top_songs": [f"song-{j}" for j in range(i, SONGS, ARTISTS)][:10]}
+        for i in range(ARTISTS)
+    ])
+
+
+def catalog_paths(rng: random.Random, count: int) -> list:
+    """Popularity-skewed mix of the cached catalog reads"""
+    paths = []
+    for _ in range(count):
+        song = f"song-{min(int(rng.paretovariate(1.2)) - 1, SONGS - 1)}"
+        artist = f"artist-{min(int(rng.paretovariate(1.2)) - 1, ARTISTS - 1)}"
+        paths.append(rng.choice([
+            f"/api/songs/{song}", f"/api/songs/{song}/lyrics", f"/api/artists/{artist}", f"/api/artists/{artist}/top-songs"
+        ]))
+    return paths
+
+
+async def main():
+    rng = random.Random(42)
+    db = await scratch_database()
+    await seed(db, rng)
+    paths = catalog_paths(rng, 100000)
+    cached_entries = response_cache._entries
+
+    async with asgi_client() as client:
+        etags = {}
+        runs = (
+            ("response cache off", False, False),
+            ("response cache on", True, False),
+            ("response cache on, clients revalidate (304)", True, True),
+        )
+        for label, enabled, revalidate in runs:
+            # Off: every lookup misses, so each request renders from MongoDB
+            response_cache._entries = cached_entries if enabled else TTLCache(1, 0, on_evict=response_cache._untag)
+            trips_before, calls = db_round_trips(), 0
+
+            async def read():
+                nonlocal calls
+                path = paths[calls % len(paths)]
+                calls += 1
+                headers = {"If-None-Match": etags[path]} if revalidate and path in etags else {}
+                response = await client.get(path, headers=headers)
+                assert response.status_code in (200, 304), response.text
+                etags[path] = response.headers["etag"]
+
+            report(label, await measure_async(read, seconds=5, concurrency=CONCURRENCY))
+            print(f"{'':<48} {(db_round_trips() - trips_before) / calls:.2f} MongoDB queries per request, "
+                  f"{response_cache.not_modified} answered 304 so far")
+
+    response_cache._entries = cached_entries
+    await drop_scratch_database(db)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""/api/songs/search on a synthetic catalog: text indexes + prefix fallback vs the old $regex scans (user-010)
+
+Needs mongod at MONGO_URL. BENCH_CATALOG_SIZE sets the number of songs (default 1,000,000).
+"""
+import asyncio
+import os
+import random
+
+from common import asgi_client, drop_scratch_database, measure_async, report, scratch_database
+
+from suggest import build_suggest_index
+
+CATALOG_SIZE = int(os.environ.get("BENCH_CATALOG_SIZE", "1000000"))
+INSERT_BATCH = 10000
+SYLLABLES = ["la", "mo", "ri", "ka", "ve", "no", "shi", "ta", "lu", "be", "do", "ra", "mi", "sa", "ko", "ne"]
+
+
+def _vocabulary(rng: random.Random, size: int = 5000) -> list:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+async def seed(db, rng: random.Random, words: list):
+    # Zipf-like word frequencies so some terms are common and most are rare
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+
+    def name(k: int) -> str:
+        return " ".join(rng.choices(words, weights, k=k)).title()
+
+    artists = [name(2) for _ in range(10000)]
+    await db.artists.insert_many([
+        {"artist_id": f"artist-{i}", "name": artist, "followers": rng.randint(0, 10**6)} for i, artist in enumerate(artists)
+    ])
+    await db.playlists.insert_many([
+        {"playlist_id": f"playlist-{i}", "name": name(3), "description": name(6), "is_public": True,
+         "followers": rng.randint(0, 10**5), "songs": []}
+        for i in range(10000)
+    ])
+    for start in range(0, CATALOG_SIZE, INSERT_BATCH):
+        await db.songs.insert_many([
+            {"song_id": f"song-{i}", "title": name(rng.randint(1, 4)), "artist": rng.choice(artists), "album": name(2),
+             "plays": rng.randint(0, 10**6), "region": "Global", "genre": "Pop"}
+            for i in range(start, min(start + INSERT_BATCH, CATALOG_SIZE))
+        ], ordered=False)
+    await build_suggest_index(db)
+
+
+async def regex_search(db, q: str) -> dict:
+    """The previous implementation: three unanchored case-insensitive regex scans, one after another"""
+    query_regex = {"$regex": q, "$options": "i"}
+    songs = await db.songs.find(
+        {"$or": [{"title": query_regex}, {"artist": query_regex}, {"album": query_regex}]}, {"_id": 0}
+    ).limit(10).to_list(10)
+    playlists = await db.playlists.find(
+        {"$or": [{"name": query_regex}, {"description": query_regex}]}, {"_id": 0}
+    ).limit(5).to_list(5)
+    artists = await db.artists.find({"name": query_regex}, {"_id": 0}).limit(5).to_list(5)
+    return {"songs": songs, "playlists": playlists, "artists": artists}
+
+
+async def main():
+    rng = random.Random(42)
+    words = _vocabulary(rng)
+    db = await scratch_database()
+    print(f"Seeding {CATALOG_SIZE:,} songs...")
+    await seed(db, rng, words)
+
+    queries = {
+        "common word": words[0],
+        "rare word": words[-1],
+        "two words": f"{words[3]} {words[700]}",
+        "partial word": words[50][:3],
+        "no match": "qqqzzx"
+    }
+    async with asgi_client() as client:
+        for label, q in queries.items():
+            async def indexed():
+                response = await client.get("/api/songs/search", params={"q": q})
+                assert response.status_code == 200, response.text
+
+            report(f"{label}: $regex x3 sequential", await measure_async(lambda: regex_search(db, q), seconds=5))
+            report(f"{label}: text index + prefix fallback", await measure_async(indexed, seconds=5))
+
+    await drop_scratch_database(db)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""Requests/s per worker for a 100-song list: default JSONResponse vs ORJSONResponse (user-020)
+
+The first part needs no database: two otherwise identical routes return the same 100 song documents.
+The second part times /api/songs?limit=100 itself and runs only when a mongod answers at MONGO_URL.
+"""
+import asyncio
+import os
+from datetime import datetime, timezone
+
+from common import asgi_client, drop_scratch_database, measure, measure_async, report, scratch_database
+
+import httpx
+import orjson
+from database import close_database
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pymongo.errors import ServerSelectionTimeoutError
+
+os.environ.setdefault("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")
+
+NOW = datetime.now(timezone.utc)
+SONGS = [
+    {"song_id": f"song-{i}", "title": f"Song {i}", "artist": "Artist", "album": "Album", "duration": 215,
+     "cover_url": "https://images.example.com/cover.jpg", "youtube_id": "dQw4w9WgXcQ", "genre": "Pop",
+     "region": "Global", "plays": 1000000 - i, "release_year": 2024, "source": "youtube", "created_at": NOW}
+    for i in range(100)
+]
+
+
+def serialization_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/default")
+    async def default():
+        return SONGS  # jsonable_encoder + json.dumps
+
+    @app.get("/orjson", response_class=ORJSONResponse)
+    async def fast():
+        return ORJSONResponse(SONGS)
+
+    return app
+
+
+async def without_database():
+    report("encode: jsonable_encoder + json.dumps", measure(lambda: JSONResponse(jsonable_encoder(SONGS)).body))
+    report("encode: orjson", measure(lambda: orjson.dumps(SONGS)))
+
+    transport = httpx.ASGITransport(app=serialization_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/default", "/orjson"):
+            report(f"route {path}: 100 songs", await measure_async(lambda: client.get(path), seconds=3))
+
+
+async def with_database():
+    try:
+        db = await scratch_database()
+    except ServerSelectionTimeoutError:
+        close_database()
+        print("/api/songs?limit=100: skipped, no mongod at MONGO_URL")
+        return
+    await db.songs.insert_many([
+        {**song, "song_id": f"{song['song_id']}-{copy}", "lyrics": []} for copy in range(10) for song in SONGS
+    ])
+
+    async with asgi_client() as client:
+        async def songs():
+            response = await client.get("/api/songs", params={"limit": 100})
+            assert response.status_code == 200, response.text
+
+        report("/api/songs?limit=100", await measure_async(songs, seconds=5))
+
+    await drop_scratch_database(db)
+
+
+async def main():
+    await without_database()
+    await with_database()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""Session validation throughput: signed tokens (CPU + in-memory denylist) vs the user_sessions lookup (user-023)
+
+The signed-token part needs no database. The user_sessions part runs only when a mongod answers at MONGO_URL.
+"""
+import asyncio
+import os
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+
+from common import drop_scratch_database, measure, measure_async, report, scratch_database
+
+import auth
+from database import close_database, connect_database
+from pymongo.errors import ServerSelectionTimeoutError
+from session_tokens import RevocationList, SessionSigner
+from starlette.requests import Request
+
+os.environ.setdefault("MONGO_SERVER_SELECTION_TIMEOUT_MS", "2000")
+
+REVOKED = 10000
+
+
+def bearer(token: str) -> Request:
+    return Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+async def signed_tokens():
+    # A rotated key set: tokens signed with the previous key still verify
+    signer = SessionSigner([("k2", secrets.token_bytes(32)), ("k1", secrets.token_bytes(32))])
+    expires_at = datetime.now(timezone.utc) + timedelta(days=7)
+    token = signer.sign("bench-user", expires_at)
+    old_token = SessionSigner([("k1", signer.keys["k1"])]).sign("bench-user", expires_at)
+
+    report("SessionSigner.verify, active key", measure(lambda: signer.verify(token)))
+    report("SessionSigner.verify, previous key", measure(lambda: signer.verify(old_token)))
+
+    # Denylist already loaded, as between refreshes: no MongoDB access on the request path
+    revocations = RevocationList(refresh_interval=3600)
+    revocations._revoked = {secrets.token_urlsafe(12): expires_at for _ in range(REVOKED)}
+    revocations._last_refresh = time.monotonic()
+    auth.session_signer, auth.revocations = signer, revocations
+
+    connect_database()  # get_database() is evaluated for the denylist; no query is sent
+    request = bearer(token)
+    report(f"get_session_user_id, signed ({REVOKED:,} revoked)", await measure_async(lambda: auth.get_session_user_id(request)))
+    close_database()
+
+
+async def database_sessions():
+    try:
+        db = await scratch_database()
+    except ServerSelectionTimeoutError:
+        close_database()
+        print("get_session_user_id, user_sessions lookup: skipped, no mongod at MONGO_URL")
+        return
+    await db.user_sessions.insert_one({
+        "user_id": "bench-user", "session_token": "bench-session",
+        "expires_at": datetime.now(timezone.utc) + timedelta(days=7)
+    })
+    request = bearer("bench-session")
+
+    async def uncached():
+        auth._session_cache.clear()
+        await auth.get_session_user_id(request)
+
+    report("get_session_user_id, user_sessions find_one", await measure_async(uncached))
+    report("get_session_user_id, session cache hit", await measure_async(lambda: auth.get_session_user_id(request)))
+    await drop_scratch_database(db)
+
+
+async def main():
+    await signed_tokens()
+    await database_sessions()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""Suggest latency and index memory at 1M names (user-011)
+
+Needs no database: the prefix index is built from synthetic names, as build_suggest_index does at startup.
+"""
+import math
+import random
+import time
+
+from common import report
+
+from suggest import PrefixIndex, SCAN_LIMIT, normalize
+
+NAMES = 1_000_000
+QUERIES = 20000
+WORDS = [
+    "love", "night", "light", "heart", "dance", "fire", "dream", "blue", "summer", "rain", "star", "gold",
+    "home", "wild", "baby", "girl", "boy", "city", "road", "time", "world", "sky", "moon", "sun", "river",
+    "shadow", "electric", "midnight", "forever", "broken", "young", "alive", "crazy", "lonely", "sweet",
+    "paradise", "thunder", "ocean", "silver", "angel", "ghost", "fever", "magic", "echo", "storm", "velvet",
+]
+
+
+def synthetic_docs(rng: random.Random) -> list:
+    docs = []
+    for i in range(NAMES):
+        words = rng.choices(WORDS, k=rng.randint(1, 4))
+        # A quarter of the names carry a rarer word, as real catalogs do
+        if i % 4 == 0:
+            words.append(f"{rng.choice(WORDS)}{i % 9973}")
+        docs.append({"type": "song", "id": f"song-{i}", "label": " ".join(words).title(),
+                     "subtitle": f"Artist {i % 50000}", "score": int(rng.paretovariate(1.1) * 100)})
+    return docs
+
+
+def latencies(index: PrefixIndex, queries: list) -> dict:
+    timings = []
+    started = time.perf_counter()
+    for query in queries:
+        t = time.perf_counter()
+        index.suggest(query, 10)
+        timings.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        "ops_per_sec": len(timings) / elapsed,
+        "mean_us": sum(timings) / len(timings) * 1e6,
+        "p99_us": timings[math.ceil(len(timings) * 0.99) - 1] * 1e6
+    }
+
+
+def main():
+    rng = random.Random(42)
+    docs = synthetic_docs(rng)
+    index = PrefixIndex()
+    started = time.perf_counter()
+    index.build(docs)
+    print(f"build: {time.perf_counter() - started:.1f} s for {NAMES:,} names")
+    stats = index.stats()
+    print(f"stats: {stats['entries']:,} entries, {stats['cached_prefixes']:,} pre-ranked prefixes "
+          f"(ranges over {SCAN_LIMIT}), ~{stats['approx_bytes'] / 2**20:,.0f} MiB")
+
+    # Typed-as-you-go prefixes of real names, 1 to 8 characters; every one is the first query for it
+    queries = []
+    for doc in rng.sample(docs, QUERIES):
+        label = normalize(doc["label"])
+        queries.append(label[:rng.randint(1, min(8, len(label)))])
+    report("suggest, first query per prefix", latencies(index, queries))
+    report("suggest, repeated prefixes", latencies(index, queries))
+
+    # Removals repair the pre-ranked lists in place; the next queries still need no re-ranking
+    for doc in rng.sample(docs, 1000):
+        index.remove(doc["type"], doc["id"])
+    report("suggest, after 1,000 removals", latencies(index, queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Per-call overhead of building a YouTube client per request vs reusing one per key (user-002)"""
+import asyncio
+
+from common import measure, measure_async, report, start_stub_server
+
+import httpx
+import youtube_service
+from googleapiclient.discovery import build
+
+API_KEY = "bench-key"
+VIDEO = {"items": [{"id": "abc", "snippet": {"title": "Song"}}]}
+
+
+async def main():
+    base_url = f"{start_stub_server(VIDEO)}/youtube/v3"
+    youtube_service.YOUTUBE_API_BASE_URL = base_url
+
+    # Before: the discovery document is parsed and a transport created on every call
+    report("discovery build() per call (no request)", measure(
+        lambda: build("youtube", "v3", developerKey=API_KEY, cache_discovery=False)
+    ))
+
+    async def fresh_client_call():
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            (await client.get("/videos", params={"id": "abc", "key": API_KEY})).json()
+
+    report("new HTTP client + connection per call", await measure_async(fresh_client_call))
+
+    # After: one client per key over a shared keep-alive pool
+    async def cached_client_call():
+        await youtube_service.get_youtube_client(API_KEY).get("videos", id="abc")
+
+    report("cached client, pooled connection", await measure_async(cached_client_call))
+    report("cached client lookup only", measure(lambda: youtube_service.get_youtube_client(API_KEY)))
+
+    await youtube_service.close_http_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
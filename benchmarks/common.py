@@ -0,0 +1,114 @@
+"""Shared helpers for the benchmark scripts; run them from the repo root, e.g. python benchmarks/bench_auth.py"""
+import asyncio
+import json
+import math
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Awaitable, Callable
+
+# Backend modules import each other by bare name, as they do under uvicorn
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# DB-backed benchmarks need a real mongod at MONGO_URL; they seed and drop a scratch database
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "shinyfy_bench")
+
+
+def _summary(latencies: list, elapsed: float) -> dict:
+    latencies.sort()
+    return {
+        "ops_per_sec": len(latencies) / elapsed,
+        "mean_us": statistics.fmean(latencies) * 1e6,
+        "p99_us": latencies[math.ceil(len(latencies) * 0.99) - 1] * 1e6
+    }
+
+
+def measure(fn: Callable[[], object], seconds: float = 2.0) -> dict:
+    """Call fn in a loop for about `seconds`; throughput and latency"""
+    latencies = []
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        t = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t)
+    return _summary(latencies, time.perf_counter() - started)
+
+
+async def measure_async(fn: Callable[[], Awaitable[object]], seconds: float = 2.0, concurrency: int = 1) -> dict:
+    """Run `concurrency` loops awaiting fn for about `seconds`; throughput and latency"""
+    latencies = []
+    started = time.perf_counter()
+
+    async def worker():
+        while time.perf_counter() - started < seconds:
+            t = time.perf_counter()
+            await fn()
+            latencies.append(time.perf_counter() - t)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return _summary(latencies, time.perf_counter() - started)
+
+
+def report(label: str, result: dict):
+    print(f"{label:<48} {result['ops_per_sec']:>12,.0f} ops/s  mean {result['mean_us']:>10,.1f} us  "
+          f"p99 {result['p99_us']:>10,.1f} us")
+
+
+async def scratch_database():
+    """Connect to MONGO_URL and return an empty, indexed DB_NAME database"""
+    from database import connect_database
+    from indexes import ensure_indexes
+    db = connect_database()
+    await db.client.drop_database(db.name)
+    await ensure_indexes(db)
+    return db
+
+
+async def drop_scratch_database(db):
+    from database import close_database
+    await db.client.drop_database(db.name)
+    close_database()
+
+
+def db_round_trips() -> int:
+    """Connection checkouts so far; each MongoDB operation checks one out"""
+    from database import pool_stats
+    return pool_stats.checkouts
+
+
+def asgi_client():
+    """httpx client calling the FastAPI app in-process (no lifespan; connect the database first)"""
+    import httpx
+    from server import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; without this, delayed ACKs add ~40ms per response
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        payload = json.dumps(self.server.body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_stub_server(body: dict) -> str:
+    """Local HTTP server answering every GET with body; returns its base URL"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.body = body
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
@@ -26,26 +26,19 @@ const Home = () => {
     try {
       setLoading(true);
       
-      // Fetch songs
-      const songsResponse = await axios.get(`${API}/songs?limit=20`);
-      setSongs(songsResponse.data);
+      // Songs, playlists and recently played come from one aggregated call
+      const homeResponse = await axios.get(`${API}/home`, {
+        withCredentials: true
+      });
+      const { songs, playlists, recently_played } = homeResponse.data;
+      setSongs(songs);
+      setPlaylists(playlists);
       
-      // Fetch playlists
-      const playlistsResponse = await axios.get(`${API}/playlists?limit=10`);
-      setPlaylists(playlistsResponse.data);
-      
-      // Fetch recently played if authenticated
+      // Fall back to top songs for anonymous visitors
       if (isAuthenticated) {
-        try {
-          const recentResponse = await axios.get(`${API}/library/recently-played`, {
-            withCredentials: true
-          });
-          setRecentlyPlayed(recentResponse.data.slice(0, 4));
-        } catch (error) {
-          console.error('Error fetching recently played:', error);
-        }
+        setRecentlyPlayed(recently_played.slice(0, 4));
       } else {
-        setRecentlyPlayed(songsResponse.data.slice(0, 4));
+        setRecentlyPlayed(songs.slice(0, 4));
       }
       
     } catch (error) {
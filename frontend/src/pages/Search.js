@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { Search as SearchIcon, X } from 'lucide-react';
 import TrackList from '../components/TrackList';
 import PlaylistCard from '../components/PlaylistCard';
@@ -6,6 +6,7 @@ import axios from 'axios';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const SEARCH_DEBOUNCE_MS = 250;
 
 const Search = () => {
   const [searchQuery, setSearchQuery] = useState('');
@@ -14,6 +15,8 @@ const Search = () => {
   const [filteredPlaylists, setFilteredPlaylists] = useState([]);
   const [filteredArtists, setFilteredArtists] = useState([]);
   const [searching, setSearching] = useState(false);
+  const debounceTimer = useRef(null);
+  const latestRequest = useRef(0);
 
   const filters = ['all', 'songs', 'playlists', 'artists'];
 
@@ -25,27 +28,35 @@ const Search = () => {
       return;
     }
 
+    // Only the newest request may update results; older responses can arrive after it
+    const requestId = ++latestRequest.current;
     try {
       setSearching(true);
       const response = await axios.get(`${API}/songs/search?q=${encodeURIComponent(query)}`);
+      if (requestId !== latestRequest.current) return;
       setFilteredSongs(response.data.songs || []);
       setFilteredPlaylists(response.data.playlists || []);
       setFilteredArtists(response.data.artists || []);
     } catch (error) {
       console.error('Search error:', error);
     } finally {
-      setSearching(false);
+      if (requestId === latestRequest.current) setSearching(false);
     }
   };
 
+  useEffect(() => () => clearTimeout(debounceTimer.current), []);
+
   const handleInputChange = (e) => {
     const value = e.target.value;
     setSearchQuery(value);
     
-    // Debounce search
+    // Debounce search: one request once typing pauses, not one per keystroke
+    clearTimeout(debounceTimer.current);
     if (value.trim()) {
-      handleSearch(value);
+      debounceTimer.current = setTimeout(() => handleSearch(value), SEARCH_DEBOUNCE_MS);
     } else {
+      latestRequest.current += 1;
+      setSearching(false);
       setFilteredSongs([]);
       setFilteredPlaylists([]);
       setFilteredArtists([]);
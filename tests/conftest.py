@@ -0,0 +1,17 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other by bare name (from cache import ...), as they do under uvicorn
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+# Read at import time by the backend modules; no MongoDB or Google account is contacted
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("YOUTUBE_API_KEY_1", "test-key-0001")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,94 @@
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import auth
+import database
+import server
+
+pytestmark = pytest.mark.anyio
+
+SESSION_DATA = {"id": "emergent-1", "email": "listener@example.com", "name": "Listener", "session_token": "upstream-token"}
+
+
+class AuthService:
+    """MockTransport handler that replays scripted responses and records each request"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+async def auth_service(monkeypatch):
+    """Route the shared auth client through a MockTransport; retries don't sleep"""
+    monkeypatch.setattr(auth, "AUTH_HTTP_BACKOFF", 0)
+
+    def install(*responses) -> AuthService:
+        service = AuthService(*responses)
+        monkeypatch.setattr(auth, "_auth_http_client", httpx.AsyncClient(transport=httpx.MockTransport(service)))
+        return service
+
+    yield install
+    await auth.close_auth_http_client()
+
+
+async def test_session_exchange_reuses_the_shared_client(auth_service):
+    service = auth_service(httpx.Response(200, json=SESSION_DATA))
+    client = auth.get_auth_http_client()
+
+    assert await auth.get_session_data("session-1") == SESSION_DATA
+    assert await auth.get_session_data("session-2") == SESSION_DATA
+
+    assert auth.get_auth_http_client() is client
+    assert [request.headers["X-Session-ID"] for request in service.requests] == ["session-1", "session-2"]
+
+
+async def test_transient_failures_are_retried(auth_service):
+    service = auth_service(
+        httpx.Response(503),
+        httpx.ConnectError("connection refused"),
+        httpx.Response(200, json=SESSION_DATA)
+    )
+
+    assert await auth.get_session_data("session-1") == SESSION_DATA
+    assert len(service.requests) == 3
+
+
+async def test_exhausted_retries_return_503(auth_service):
+    service = auth_service(httpx.Response(502))
+
+    with pytest.raises(HTTPException) as error:
+        await auth.get_session_data("session-1")
+
+    assert error.value.status_code == 503
+    assert len(service.requests) == auth.AUTH_HTTP_RETRIES + 1
+
+
+async def test_rejected_session_is_not_retried(auth_service):
+    service = auth_service(httpx.Response(404, json={"detail": "Session not found"}))
+
+    with pytest.raises(HTTPException) as error:
+        await auth.get_session_data("session-1")
+
+    assert error.value.status_code == 401
+    assert len(service.requests) == 1
+
+
+async def test_login_passes_auth_outage_through_as_503(auth_service, monkeypatch):
+    auth_service(httpx.ReadTimeout("timed out"))
+    # The exchange fails before MongoDB is touched
+    monkeypatch.setitem(server.app.dependency_overrides, database.get_database, lambda: None)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as client:
+        response = await client.post("/api/auth/session", json={"session_id": "session-1"})
+
+    assert response.status_code == 503
+    assert response.json() == {"detail": "Auth service unavailable"}
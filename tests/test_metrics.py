@@ -0,0 +1,26 @@
+import httpx
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+async def get_metrics(headers=None) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as client:
+        return await client.get("/api/metrics", headers=headers)
+
+
+async def test_metrics_are_off_without_a_token(monkeypatch):
+    monkeypatch.setattr(server, "METRICS_TOKEN", "")
+    assert (await get_metrics()).status_code == 404
+
+
+async def test_metrics_require_the_token(monkeypatch):
+    monkeypatch.setattr(server, "METRICS_TOKEN", "metrics-secret")
+    assert (await get_metrics()).status_code == 401
+    assert (await get_metrics({"Authorization": "Bearer wrong"})).status_code == 401
+
+    response = await get_metrics({"Authorization": "Bearer metrics-secret"})
+    assert response.status_code == 200
+    assert "youtube_quota" in response.json()
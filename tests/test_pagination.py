@@ -0,0 +1,33 @@
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+from pagination import fetch_page
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def songs():
+    collection = AsyncMongoMockClient()["test"]["songs"]
+    await collection.insert_many([{"song_id": f"song-{i}", "plays": i % 7} for i in range(25)])
+    return collection
+
+
+async def test_cursor_pages_cover_every_document_once(songs):
+    seen, cursor = [], ""
+    while cursor is not None:
+        page, cursor = await fetch_page(songs, {}, "plays", 10, cursor=cursor)
+        seen.extend(song["song_id"] for song in page)
+    assert sorted(seen) == sorted(f"song-{i}" for i in range(25))
+    assert len(seen) == 25
+
+
+async def test_skip_is_rejected_with_a_cursor(songs):
+    _, cursor = await fetch_page(songs, {}, "plays", 10, cursor="")
+    with pytest.raises(HTTPException) as error:
+        await fetch_page(songs, {}, "plays", 10, cursor=cursor, skip=10)
+    assert error.value.status_code == 400
+
+    legacy, _ = await fetch_page(songs, {}, "plays", 10, skip=20)
+    assert len(legacy) == 5
@@ -0,0 +1,63 @@
+import asyncio
+from collections import defaultdict
+
+import pytest
+
+from play_counter import PlayCounter
+
+pytestmark = pytest.mark.anyio
+
+
+class SlowCollection:
+    """Collection stub whose writes take `delay` seconds and are recorded when they complete"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.ops = []
+
+    async def bulk_write(self, ops, ordered=True):
+        await asyncio.sleep(self.delay)
+        self.ops.extend(ops)
+
+    async def insert_many(self, docs, ordered=True):
+        await asyncio.sleep(self.delay)
+        self.ops.extend(docs)
+
+
+class SlowDatabase:
+    def __init__(self, delay: float):
+        self.collections = defaultdict(lambda: SlowCollection(delay))
+
+    def __getattr__(self, name: str) -> SlowCollection:
+        return self.collections[name]
+
+
+async def test_stop_waits_for_the_flush_in_progress():
+    db = SlowDatabase(delay=0.2)
+    counter = PlayCounter(flush_interval_ms=10, max_pending=1000)
+    for i in range(10):
+        counter.record(f"song-{i % 3}", region="europe")
+
+    counter.start(db)
+    # The periodic flush has taken the plays out of the buffer and is waiting on its writes
+    await asyncio.sleep(0.1)
+    await counter.stop()
+
+    increments = sum(op._doc["$inc"]["plays"] for op in db.songs.ops)
+    assert increments == 10
+    assert len(db.play_events.ops) == 10
+    assert sum(op._doc["$inc"]["plays"] for op in db.play_counts_hourly.ops) == 20  # region + global
+    stats = counter.stats()
+    assert stats["pending_events"] == 0
+    assert stats["flushed_events"] == 10
+
+
+async def test_stop_flushes_plays_recorded_while_idle():
+    db = SlowDatabase(delay=0)
+    counter = PlayCounter(flush_interval_ms=60000, max_pending=1000)
+    counter.start(db)
+    counter.record("song-1")
+
+    await counter.stop()
+
+    assert [op._doc for op in db.songs.ops] == [{"$inc": {"plays": 1}}]
@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import database
+import server
+from cache import RefreshingCache, TTLCache
+from play_counter import play_counter
+
+pytestmark = pytest.mark.anyio
+
+SONG_IDS = [f"song-{i}" for i in range(30)]
+
+
+@pytest.fixture
+async def db(monkeypatch):
+    monkeypatch.setattr(database, "_client", AsyncMongoMockClient())
+    monkeypatch.setattr(server, "catalog_regions", RefreshingCache(1, 300, max_stale=0))
+    monkeypatch.setattr(server, "known_songs", TTLCache(100, 300))
+    db = database.get_database()
+    monkeypatch.setattr(play_counter, "_db", db)
+
+    await db.songs.insert_many([{"song_id": song_id, "region": "Europe", "plays": 0} for song_id in SONG_IDS])
+    await db.users.insert_one({"user_id": "user-1", "email": "listener@example.com", "name": "Listener"})
+    await db.user_sessions.insert_one({
+        "user_id": "user-1",
+        "session_token": "token-1",
+        "expires_at": datetime.now(timezone.utc) + timedelta(days=1)
+    })
+    return db
+
+
+async def test_parallel_plays_are_not_lost(db):
+    # 30 distinct songs, three plays each, all in flight at once
+    plays = SONG_IDS * 3
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as client:
+        responses = await asyncio.gather(*(
+            client.post(f"/api/songs/{song_id}/play", params={"region": "europe"}, headers={"Authorization": "Bearer token-1"})
+            for song_id in plays
+        ))
+    assert {response.status_code for response in responses} == {200}
+
+    await play_counter.flush()
+
+    counts = {song["song_id"]: song["plays"] async for song in db.songs.find({}, {"_id": 0, "song_id": 1, "plays": 1})}
+    assert counts == {song_id: 3 for song_id in SONG_IDS}
+
+    user = await db.users.find_one({"user_id": "user-1"})
+    recently_played = user["recently_played"]
+    assert len(recently_played) == server.RECENTLY_PLAYED_LIMIT
+    assert len(set(recently_played)) == len(recently_played)
+    assert set(recently_played) <= set(SONG_IDS)
+
+
+async def test_anonymous_play_is_counted(db):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as client:
+        response = await client.post(f"/api/songs/{SONG_IDS[0]}/play")
+    assert response.status_code == 200
+
+    await play_counter.flush()
+    assert (await db.songs.find_one({"song_id": SONG_IDS[0]}))["plays"] == 1
+
+
+async def test_unknown_song_or_region_is_rejected(db):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as client:
+        unknown_song = await client.post("/api/songs/no-such-song/play")
+        unknown_region = await client.post(f"/api/songs/{SONG_IDS[0]}/play", params={"region": "atlantis"})
+    assert unknown_song.status_code == 404
+    assert unknown_region.status_code == 400
+    assert server.known_songs.get("no-such-song") is None
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import pytest
+
+import youtube_service
+
+pytestmark = pytest.mark.anyio
+
+SNIPPET = {"title": "Song", "channelTitle": "Artist", "thumbnails": {"high": {"url": "https://img"}}, "publishedAt": "2024-01-01T00:00:00Z"}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        resource = url.path.rsplit("/", 1)[-1]
+        status, body = self.server.handle_call(resource, params)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class StubYouTube(ThreadingHTTPServer):
+    """Local stand-in for the YouTube Data API that counts calls and how many ran at once"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.delay = 0.0
+        self.fail_status = None
+        self.calls = {"search": 0, "videos": 0}
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/youtube/v3"
+
+    def handle_call(self, resource: str, params: dict):
+        with self._lock:
+            self.calls[resource] += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+        if self.fail_status is not None:
+            return self.fail_status, {"error": {"message": "upstream failure", "errors": [{"reason": "backendError"}]}}
+        if resource == "search":
+            prefix = params["q"].split()[0]
+            items = [{"id": {"videoId": f"{prefix}-{i}"}, "snippet": SNIPPET} for i in range(int(params["maxResults"]))]
+        else:
+            items = [
+                {"id": video_id, "snippet": SNIPPET, "contentDetails": {"duration": "PT3M"}, "statistics": {"viewCount": "7"}}
+                for video_id in params["id"].split(",")
+            ]
+        return 200, {"items": items}
+
+
+@pytest.fixture
+async def youtube_stub(monkeypatch):
+    stub = StubYouTube()
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    monkeypatch.setattr(youtube_service, "YOUTUBE_API_BASE_URL", stub.url)
+    monkeypatch.setattr(youtube_service, "key_pool", youtube_service.APIKeyPool(
+        youtube_service.YOUTUBE_API_KEYS, youtube_service.YOUTUBE_DAILY_QUOTA
+    ))
+    for cache in youtube_service._caches.values():
+        cache.clear()
+    youtube_service._recent_errors.clear()
+    await youtube_service.close_http_client()
+
+    yield stub
+
+    await youtube_service.close_http_client()
+    stub.shutdown()
+    stub.server_close()
+
+
+def api_client() -> httpx.AsyncClient:
+    from server import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def test_concurrent_searches_overlap(youtube_stub):
+    youtube_stub.delay = 0.3
+
+    async with api_client() as client:
+        started = time.monotonic()
+        responses = await asyncio.gather(*(
+            client.get("/api/youtube/search", params={"q": f"song{i}", "max_results": 3}) for i in range(5)
+        ))
+        elapsed = time.monotonic() - started
+
+    assert [response.status_code for response in responses] == [200] * 5
+    assert [video["video_id"] for video in responses[2].json()["videos"]] == ["song2-0", "song2-1", "song2-2"]
+    # Each search is a search.list then a videos.list call: 3s if the five ran one after another
+    assert youtube_stub.calls == {"search": 5, "videos": 5}
+    assert youtube_stub.max_active == 5
+    assert elapsed < 1.5
+
+
+async def test_concurrent_identical_lookups_share_one_call(youtube_stub):
+    youtube_stub.delay = 0.2
+
+    videos = await asyncio.gather(*(youtube_service.get_youtube_video_details("abc") for _ in range(20)))
+
+    assert youtube_stub.calls["videos"] == 1
+    assert {video.video_id for video in videos} == {"abc"}
+
+
+async def test_concurrent_identical_searches_share_one_call(youtube_stub):
+    youtube_stub.delay = 0.2
+
+    results = await asyncio.gather(*(youtube_service.search_youtube_music("Hit Song", 3) for _ in range(10)))
+    # Queries are normalized, so a differently cased repeat is then served from the cache
+    results.append(await youtube_service.search_youtube_music("hit  song", 3))
+
+    assert youtube_stub.calls == {"search": 1, "videos": 1}
+    assert all(result == results[0] for result in results)
+
+
+async def test_failed_lookup_is_not_retried_by_every_caller(youtube_stub):
+    youtube_stub.delay = 0.2
+    youtube_stub.fail_status = 500
+
+    videos = await asyncio.gather(*(youtube_service.get_youtube_video_details("abc") for _ in range(20)))
+    assert videos == [None] * 20
+    assert youtube_stub.calls["videos"] == 1
+
+    # Callers arriving within YOUTUBE_ERROR_TTL get the remembered failure instead of a new call
+    assert await youtube_service.get_youtube_video_details("abc") is None
+    assert youtube_stub.calls["videos"] == 1